@@ -41,6 +41,8 @@ def main(args):
         "input": working_path,
         "output": f"output/{args.search}_{args.palette}/",
         "mode": "neon",
+        "workers": 1,
+        "tensor": False,
     }
     apply_palette(dotdict(neon_args))
 
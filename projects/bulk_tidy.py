@@ -1,12 +1,12 @@
 import argparse, os, math
 from theia.channels import invert_with_alpha
-from theia.image import load_from_path
+from theia.image import iter_from_path
 from PIL import Image
 
 
 def main(args):
     os.makedirs(args.output, exist_ok=True)
-    images = load_from_path(args.input)
+    images = iter_from_path(args.input, prefetch=4)
 
     for (name, img) in images:
         # Invert the image
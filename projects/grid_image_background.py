@@ -1,6 +1,6 @@
 from theia.image import load_images_from_path
 from theia.channels import multiply
-from theia.image import wrapped_alpha_composite, swap_quadrants
+from theia.image import SpriteCompositor, swap_quadrants
 import theia.grid as grid
 
 from PIL import Image, ImageColor
@@ -45,10 +45,17 @@ def main(args):
     emblem_generator = itertools.cycle(emblems)
 
     # Build a bunch of random grids
+    background = Image.new("RGBA", (args.size, args.size), color=args.bgcolor)
+    compositor = SpriteCompositor(background, cache_size=len(emblems) * len(args.esize) * 8)
     for i in range(args.count):
+        compositor.reset(background)
+
         # Build a random grid
         is_radial = args.radial and random.random() > 0.8
-        if is_radial:
+        if args.poisson:
+            # Poisson-disc points wrap around the edges, so the result tiles seamlessly
+            grd = grid.poisson_disc(args.size, args.poisson, wrap=True)
+        elif is_radial:
             grd = build_random_radial_grid(args.size)
         else:
             # If we're using a square grid, drop last row and column for tiling reasons
@@ -63,21 +70,29 @@ def main(args):
         if args.sparsify:
             grd = grid.sparsify(grd, args.sparsify)
 
+        # Find the space around each point, so emblems can be shrunk to avoid overlapping
+        points = grid.flatten(grd)
+        spacing = [None] * len(points)
+        if args.no_overlap and len(points) > 1:
+            index = grid.PointIndex(points, wrap=args.size)
+            spacing = index.query_nearest(points, k=2)[0][:, 1]
+
         # Build image and paste emblems
-        img = Image.new("RGBA", (args.size, args.size), color=args.bgcolor)
-        for (xx, yy) in grid.flatten(grd):
+        # Resized and rotated emblems are cached by the compositor, since the same few get reused a lot
+        for (xx, yy), space in zip(points, spacing):
             emblem = next(emblem_generator)
             esize = random.choice(args.esize)
+            if space is not None:
+                esize = max(1, min(esize, int(space)))
 
-            emblem = emblem.resize((esize, esize))
+            ang = 0
             if args.rotate:
                 ang = random.choice([-45, -45, -30, -15, 0, 0, 0, 15, 30, 45, 45])
                 # ang = random.randint(-args.rotate, args.rotate)
-                emblem = emblem.rotate(ang, Image.NEAREST, expand=True)
 
-            wrapped_alpha_composite(img, emblem, (xx - (esize // 2), yy - (esize // 2)))
+            compositor.draw(emblem, (xx - (esize // 2), yy - (esize // 2)), esize, ang)
 
-        img.save(os.path.join(path, f"grid_{i}.png"))
+        compositor.image().save(os.path.join(path, f"grid_{i}.png"))
 
 
 if __name__ == "__main__":
@@ -85,11 +100,13 @@ if __name__ == "__main__":
     parser.add_argument("--output")
     parser.add_argument("emblems")
     parser.add_argument("--radial", action="store_true")
+    parser.add_argument("--poisson", type=float, help="Use a Poisson-disc layout with this minimum spacing")
     parser.add_argument("--size", type=int, default=512)
     parser.add_argument("--esize", "-e", type=int, nargs="*", default=[48, 64, 80])
     parser.add_argument("--jitter", type=int)
     parser.add_argument("--sparsify", type=float)
     parser.add_argument("--rotate", type=int)
+    parser.add_argument("--no-overlap", action="store_true", help="Shrink emblems that would overlap their neighbours")
     parser.add_argument("--count", type=int, default=10)
     parser.add_argument("--bgcolor", default="#f1f2f6")
     parser.add_argument("--fgcolor", default="#dfe4ea")
@@ -1,30 +1,16 @@
-from theia.color import Color, average_color, color_image
+from theia.color import average_color
 from theia.palettes import (
-    ColorPalette,
-    nearest_in_palette,
+    PaletteMatcher,
+    build_palette_lut,
     convert_palette_to_named,
+    image_palette_indexes,
+    lut_palette_indexes,
 )
-from theia.image import load_from_path, load_images_from_path
+from theia.image import iter_from_path, load_images_from_path
 
 from PIL import Image
-import argparse, math, os
-
-
-def load_file(input: str, file: str, size: int):
-    image = Image.open(input + "/" + file).convert("RGB")
-    return image.resize((size, size))
-
-
-def build_palette_mapping(
-    colors: list[Color], palette: ColorPalette
-) -> dict[Color, Color]:
-    return {color: nearest_in_palette(color, palette) for color in colors}
-
-
-def apply_palette_mapping(image: Image, mapping: dict[Color, Color]) -> Image:
-    new = image.copy()
-    new.putdata([mapping.get(x) for x in image.getdata()])
-    return new
+import numpy as np
+import argparse, os
 
 
 def main(args):
@@ -36,25 +22,21 @@ def main(args):
         for f in load_images_from_path(args.palette)
     }
     palette = convert_palette_to_named(pixels.keys())
+    tiles = np.stack([np.asarray(tile.convert("RGB")) for tile in pixels.values()])
+    lut = build_palette_lut(palette, bits=args.lut, metric=args.metric) if args.lut else None
 
     # Load image and map to palette
-    for name, image in load_from_path(args.input):
-        base = image.convert("RGB")
-        colors = [c[1] for c in base.getcolors(100000)]
-        color_mapping = build_palette_mapping(colors, palette)
-
-        # Put it all together
-        canvas = Image.new("RGB", tuple([args.pixelsize * x for x in base.size]))
-        w, h = base.size
-        locations = [
-            (y * args.pixelsize, x * args.pixelsize) for x in range(w) for y in range(h)
-        ]
-
-        for k, v in enumerate(base.getdata()):
-            pixel = pixels.get(color_mapping.get(v))
-            canvas.paste(pixel, locations[k])
+    for name, image in iter_from_path(args.input, prefetch=4):
+        if lut is not None:
+            indexes = lut_palette_indexes(image, lut)
+        else:
+            indexes = image_palette_indexes(image, palette, metric=args.metric)
 
-        canvas.save(os.path.join(args.output, f"{name}.png"))
+        # Put it all together - one tile per pixel, arranged (row, tile row, column, tile column)
+        h, w = indexes.shape
+        size = args.pixelsize
+        canvas = tiles[indexes].transpose(0, 2, 1, 3, 4).reshape(h * size, w * size, 3)
+        Image.fromarray(canvas).save(os.path.join(args.output, f"{name}.png"))
 
 
 if __name__ == "__main__":
@@ -63,5 +45,7 @@ if __name__ == "__main__":
     parser.add_argument("input")
     parser.add_argument("output")
     parser.add_argument("--pixelsize", default=32, type=int)
+    parser.add_argument("--metric", default="rgb", choices=PaletteMatcher.METRICS)
+    parser.add_argument("--lut", type=int, help="Use a precomputed lookup table with this many bits per channel")
     args = parser.parse_args()
     main(args)
@@ -1,7 +1,7 @@
 import argparse
 from theia.color import Color
 from theia.gif import combine_frames
-from theia.outline import neon_glow
+from theia.outline import GlowMask, neon_mask
 from PIL import Image, ImageColor
 
 
@@ -9,10 +9,10 @@ def color_from_hue(hue: int) -> Color:
     return ImageColor.getrgb(f"hsv({str(hue)}, 100%, 100%)")
 
 
-def make_frame(base: Image, hue: int, background: Image = None) -> Image:
+def make_frame(mask: GlowMask, hue: int, background: Image = None) -> Image:
     color = color_from_hue(hue)
     canvas = background.copy()
-    canvas.alpha_composite(neon_glow(base, color))
+    canvas.alpha_composite(mask.apply(color))
     return canvas.convert("RGB")
 
 
@@ -21,11 +21,14 @@ def main(args):
     background = Image.open(args.background).convert("RGBA")
     background = background.resize(base.size)
 
+    # The glow only needs to be blurred once - each frame just recolors it
+    mask = neon_mask(base)
+
     frames = []
     shift = 360 / args.frames
     for i in range(args.frames):
         hue = args.starthue + (shift * i)
-        frames.append(make_frame(base, hue, background))
+        frames.append(make_frame(mask, hue, background))
     combine_frames(frames, args.output, framerate=args.framerate)
 
 
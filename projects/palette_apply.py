@@ -1,60 +1,52 @@
+from theia.batch import run_palette_batch, run_tensor_batch
 from theia.palettes import load_or_download_palette
 from theia.channels import multiply
-from theia.outline import neon_glow, apply_outline
-from theia.color import Color
-from theia.image import load_from_path
+from theia.outline import GlowMask, neon_mask, outline_mask
+from theia.image import iter_from_path
 
 from PIL import Image
 import argparse, os
 
 
-def mode_basic(image: Image, color: Color) -> Image:
-    return multiply(image, color)
-
-
-def mode_neon(image: Image, color: Color) -> Image:
-    return neon_glow(image, color)
-
-
-def mode_outline(image: Image, color: Color) -> Image:
-    return apply_outline(image, color)
-
-
+# Each mode is a (prepare, render) pair - see theia.batch.render_colors
+# Outline modes build their mask once per image, then apply it cheaply for each color
 OPTIONS = {
     # stop combining onto one line
-    "basic": mode_basic,
-    "neon": mode_neon,
-    "outline": mode_outline,
+    "basic": (None, multiply),
+    "neon": (neon_mask, GlowMask.apply),
+    "outline": (outline_mask, GlowMask.apply),
 }
 
 
 def main(args):
     colors = load_or_download_palette(args.palette, save=True)
-    images = load_from_path(args.input)
+    images = iter_from_path(args.input, prefetch=4)
 
     path = f"output/{args.palette}/"
     if args.output:
         path = args.output
     os.makedirs(path, exist_ok=True)
 
-    mode_function = OPTIONS.get(args.mode)
-    if not mode_function:
+    if args.mode not in OPTIONS:
         raise ValueError("Invalid mode specified!")
+    prepare, render = OPTIONS[args.mode]
 
     background = None
     if args.background:
         background = Image.open(args.background).convert("RGBA")
 
-    for (iname, im) in images:
-        for cname, color in colors.items():
-            if background:
-                canvas = background.copy().resize(im.size)
-                canvas.alpha_composite(mode_function(im, color))
-                canvas.save(os.path.join(path, f"{iname}_{cname}.png"))
-            else:
-                mode_function(im, color).save(
-                    os.path.join(path, f"{iname}_{cname}.png")
-                )
+    # Tensor mode renders same-size images in every color as a few array operations
+    # Callers without these options (eg. bulk_neon_icons) get the same defaults as the command line
+    if args.tensor:
+        memory = (args.memory or 256) * 1024 * 1024
+        results = run_tensor_batch(images, colors, path, args.mode, background, memory)
+    else:
+        results = run_palette_batch(
+            images, colors, render, path, background=background, workers=args.workers or 1, prepare=prepare
+        )
+
+    for _ in results:
+        pass
 
 
 if __name__ == "__main__":
@@ -64,5 +56,8 @@ if __name__ == "__main__":
     parser.add_argument("--output")
     parser.add_argument("--mode", default="basic")
     parser.add_argument("--background")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--tensor", action="store_true")
+    parser.add_argument("--memory", type=int, default=256, help="Tensor mode memory budget, in MB")
     args = parser.parse_args()
     main(args)
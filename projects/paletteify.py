@@ -1,45 +1,46 @@
-from theia.color import Color
 from theia.palettes import (
-    ColorPalette,
-    nearest_in_palette,
+    DITHER_METHODS,
+    PaletteCache,
+    PaletteMatcher,
+    apply_palette,
+    build_palette_lut,
+    dither,
     load_or_download_palette,
+    quantize_image,
 )
-from theia.image import load_from_path
+from theia.image import iter_from_path
 
-from PIL import Image
-import argparse, math, os
-
-MAX_COLORS = 1000000
-
-
-def build_palette_mapping(
-    colors: list[Color], palette: ColorPalette
-) -> dict[Color, Color]:
-    return {color: nearest_in_palette(color, palette) for color in colors}
-
-
-def apply_palette_mapping(image: Image, mapping: dict[Color, Color]) -> Image:
-    new = image.copy()
-    new.putdata([mapping.get(x) for x in image.getdata()])
-    return new
+import argparse, os
 
 
 def main(args):
     os.makedirs(args.output, exist_ok=True)
-    images = load_from_path(args.input)
+    images = iter_from_path(args.input, prefetch=4)
     palette = load_or_download_palette(args.palette, save=True)
+    lut = build_palette_lut(palette, bits=args.lut, metric=args.metric) if args.lut else None
+    cache = PaletteCache(args.cache_size)
 
     for (name, img) in images:
-        colors = [c[1] for c in img.getcolors(MAX_COLORS)]
-        color_mapping = build_palette_mapping(colors, palette)
-        img = apply_palette_mapping(img, color_mapping)
+        if args.dither:
+            img = dither(img, palette, method=args.dither, metric=args.metric, lut=lut)
+        elif lut is not None:
+            img = quantize_image(img, palette, lut)
+        else:
+            img = apply_palette(img, palette, metric=args.metric, cache=cache)
         img.save(os.path.join(args.output, f"{name}.png"))
 
+    if lut is None and not args.dither:
+        print(cache.cache_info())
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("palette")
     parser.add_argument("input")
     parser.add_argument("output")
+    parser.add_argument("--metric", default="rgb", choices=PaletteMatcher.METRICS)
+    parser.add_argument("--dither", choices=DITHER_METHODS)
+    parser.add_argument("--cache-size", type=int, default=65536)
+    parser.add_argument("--lut", type=int, help="Use a precomputed lookup table with this many bits per channel")
     args = parser.parse_args()
     main(args)
@@ -1,5 +1,5 @@
 from theia.palettes import load_or_download_palette
-from theia.image import load_from_path
+from theia.image import iter_from_path
 from theia.outline import drop_shadow_simple
 
 from PIL import Image
@@ -28,10 +28,7 @@ def center_image_in_frame(image, shadow):
 def main(args):
     # Load what we need
     colors = load_or_download_palette(args.palette, save=True)
-    images = load_from_path(args.input)
-    image_frames = [
-        (name, center_image_in_frame(image, args.shadow)) for (name, image) in images
-    ]
+    images = iter_from_path(args.input, prefetch=4)
 
     # Handle output directory
     path = f"output/thumbnails/{args.palette}/"
@@ -40,12 +37,17 @@ def main(args):
     os.makedirs(path, exist_ok=True)
 
     # Process all combinations
-    for cname, color in colors.items():
-        background = Image.new("RGBA", (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT), color)
-        for (iname, image) in image_frames:
-            if not image:
-                continue
+    # Images are streamed in one at a time, so build each background up front
+    backgrounds = {
+        cname: Image.new("RGBA", (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT), color)
+        for cname, color in colors.items()
+    }
+    for (iname, image) in images:
+        image = center_image_in_frame(image, args.shadow)
+        if not image:
+            continue
 
+        for cname, background in backgrounds.items():
             # Center in canvas
             canvas = background.copy()
             canvas.alpha_composite(image)
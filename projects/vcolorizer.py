@@ -1,5 +1,5 @@
 from theia.palettes import load_or_download_palette
-from theia.channels import multiply, set_alpha_channel
+from theia.channels import multiply_many, set_alpha_channel
 from theia.color import Color
 from theia.sourcetools.vmt_templater import convert_folder_to_vtf, generate_vmt
 
@@ -55,29 +55,32 @@ def validate_components(components: dict):
             size = img.size
 
 
-def colorize_base(components: dict, color: Color) -> Image:
-    """Colorize the main part of an image
+def colorize_base(components: dict, colors: list[Color]) -> list[Image]:
+    """Colorize the main part of an image in each of the given colors
 
     Args:
         components (dict): Dictionary of vcolorizer "components"
-        color (Color): Color to apply to image
+        colors (list[Color]): Colors to apply to image
 
     Returns:
-        Image: Colorized image
+        list[Image]: Colorized image for each color, in order
     """
-    canvas = components["base"].copy()
     # If we have a mask, colorize only that part
-    if components.get("mask"):
-        colorized_mask = multiply(components["mask"].copy(), color)
-        canvas.alpha_composite(colorized_mask)
-    else:
-        canvas = multiply(canvas, color)
+    mask = components.get("mask")
+    results = []
+    for colorized in multiply_many(mask or components["base"], colors):
+        if mask:
+            canvas = components["base"].copy()
+            canvas.alpha_composite(colorized)
+        else:
+            canvas = colorized
 
-    # Stamp on any overlays after colorizing
-    if components.get("overlay"):
-        canvas.alpha_composite(components["overlay"])
+        # Stamp on any overlays after colorizing
+        if components.get("overlay"):
+            canvas.alpha_composite(components["overlay"])
+        results.append(canvas)
 
-    return canvas
+    return results
 
 
 def main(args):
@@ -89,13 +92,12 @@ def main(args):
         components = load_image_components(image, dir=args.input)
         validate_components(components)
 
-        for name, color in colors.items():
-            # Recolorize the base map
-            recolorized = colorize_base(components, color)
-
+        # Recolorize the base map in every color at once
+        recolorized_all = colorize_base(components, list(colors.values()))
+        for name, recolorized in zip(colors.keys(), recolorized_all):
             # Apply basealpha if required
             if basealpha := components.get("basealpha"):
-                recolorized = set_alpha_channel(recolorized, basealpha)
+                set_alpha_channel(recolorized, basealpha, in_place=True)
 
             recolorized.save(f"{path}/{image}_{name}.png")
             generate_vmt(args.vmt, args.output, args.directory, f"{image}_{name}")
@@ -1,6 +1,4 @@
-from theia.color import tidy_color
-from sklearn.cluster import KMeans
-from collections import Counter
+from theia.color import DOMINANT_COLOR_METHODS, dominant_colors
 from PIL import Image, ImageDraw
 import argparse
 
@@ -9,9 +7,7 @@ def main(args):
     image = Image.open(args.input).convert("RGB")
 
     # Find and sort dominant colours
-    clusters = KMeans(n_clusters=args.num).fit(image.getdata())
-    total = len(clusters.labels_)
-    group_counts = Counter(clusters.labels_)
+    colors = dominant_colors(image, args.num, method=args.method)
 
     # Draw cool rectangles
     canvas = Image.new(
@@ -21,9 +17,8 @@ def main(args):
     )
     draw = ImageDraw.Draw(canvas)
     xx = 0
-    for (group, count) in group_counts.most_common():
-        size = round((count / total) * image.size[0])
-        color = tidy_color(clusters.cluster_centers_[group])
+    for (color, share) in colors:
+        size = round(share * image.size[0])
         draw.rectangle((xx, image.size[1] + args.gap, xx + size, canvas.size[1]), color)
         xx += size
 
@@ -35,7 +30,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("input")
     parser.add_argument("output")
-    parser.add_argument("--num", default=5)
+    parser.add_argument("--num", type=int, default=5)
+    parser.add_argument("--method", default="kmeans", choices=DOMINANT_COLOR_METHODS)
     parser.add_argument("--height", type=int, default=32)
     parser.add_argument("--gap", type=int, default=8)
     args = parser.parse_args()
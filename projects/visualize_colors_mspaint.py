@@ -1,6 +1,4 @@
-from theia.color import tidy_color
-from sklearn.cluster import KMeans
-from collections import Counter
+from theia.color import DOMINANT_COLOR_METHODS, dominant_colors
 from PIL import Image, ImageDraw, ImageFont
 import argparse, math
 
@@ -25,7 +23,6 @@ def draw_color_box(
 
 def main(args):
     image = Image.open(args.input).convert("RGB")
-    image_for_clusters = image.resize((100, 100))
 
     # Resize particularly large images
     if any(x >= 300 for x in image.size):
@@ -34,13 +31,10 @@ def main(args):
         image = image.resize((300, math.floor(300 * ratio)))
 
     # Find and sort dominant colours
-    clusters = KMeans(n_clusters=args.num).fit(image_for_clusters.getdata())
-    total = len(clusters.labels_)
-    group_counts = Counter(clusters.labels_)
-    color_groups = group_counts.most_common()
+    color_groups = dominant_colors(image, args.num, method=args.method)
 
     def get_color(idx):
-        return tidy_color(clusters.cluster_centers_[color_groups[idx][0]])
+        return color_groups[idx][0]
 
     # Draw an MS-Paint style background
     width = image.size[0] + 60
@@ -113,7 +107,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("input")
     parser.add_argument("output")
-    parser.add_argument("--num", default=12)
+    parser.add_argument("--num", type=int, default=12)
+    parser.add_argument("--method", default="kmeans", choices=DOMINANT_COLOR_METHODS)
     parser.add_argument(
         "--helptext", default="For Help, click Help Topics on the Help Menu"
     )
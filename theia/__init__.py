@@ -1,4 +1,5 @@
 # flake8: noqa
+import theia.batch as batch
 import theia.channels as channels
 import theia.color as color
 import theia.flaticon as flaticon
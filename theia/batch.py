@@ -0,0 +1,341 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from math import ceil
+from typing import Any, Callable, Iterable, Iterator
+from PIL import Image
+from theia.color import Color
+from theia.image import alpha_composite_into
+from theia.outline import GlowMask, neon_mask, outline_mask
+from theia.palettes import ColorPalette
+import numpy as np
+import os
+
+# Function to render an image in a given color, eg. channels.multiply or outline.neon_glow
+Renderer = Callable[[Image, Color], Image]
+
+# Function to do any color-independent work for an image once, eg. outline.neon_mask
+# The renderer is then given the result of this instead of the image
+Preparer = Callable[[Image], Any]
+
+# Settings shared by every task in a worker process - see _init_worker
+_worker_settings = {}
+
+# Preparer for each tensor batch mode - see run_tensor_batch
+TENSOR_MODES = {
+    # stop combining onto one line
+    "basic": None,
+    "neon": neon_mask,
+    "outline": outline_mask,
+}
+
+# Default working memory for one tensor batch chunk, in bytes
+DEFAULT_TENSOR_MEMORY = 256 * 1024 * 1024
+
+# Rough working bytes per output pixel, covering the uint8 result and any compositing intermediates
+_TENSOR_PIXEL_BYTES = 16
+
+
+def render_colors(
+    name: str,
+    image: Image,
+    colors: list[tuple[str, Color]],
+    func: Renderer,
+    output: str,
+    background: Image = None,
+    prepare: Preparer = None,
+) -> list[str]:
+    """Render one image in each of the given colors, saving each result as it is made
+    Results are saved as {name}_{color name}.png in the output directory
+
+    If a prepare function is given, it is called once and func is given its result instead of the image
+    eg. prepare=outline.neon_mask, func=outline.GlowMask.apply
+
+    Args:
+        name (str): Image name
+        image (Image): Image to render
+        colors (list[tuple[str, Color]]): List of (color name, color) pairs
+        func (Renderer): Function to render the image in a given color
+        output (str): Output directory
+        background (Image, optional): Background to composite each result onto. Defaults to None.
+        prepare (Preparer, optional): Function to do color-independent work once. Defaults to None.
+
+    Returns:
+        list[str]: Paths to all saved images
+    """
+    if background is not None:
+        background = background.resize(image.size)
+
+    source = prepare(image) if prepare is not None else image
+    paths = []
+    for cname, color in colors:
+        result = func(source, color)
+        if background is not None:
+            canvas = background.copy()
+            canvas.alpha_composite(result)
+            result = canvas
+
+        path = os.path.join(output, f"{name}_{cname}.png")
+        result.save(path)
+        paths.append(path)
+    return paths
+
+
+def _init_worker(func: Renderer, output: str, background: Image, prepare: Preparer):
+    """Store the settings shared by every task, so they only need to be sent to each worker once"""
+    _worker_settings.update(func=func, output=output, background=background, prepare=prepare)
+
+
+def _render_task(name: str, image: Image, colors: list[tuple[str, Color]]) -> list[str]:
+    return render_colors(name, image, colors, **_worker_settings)
+
+
+def run_palette_batch(
+    images: Iterable[tuple[str, Image]],
+    colors: ColorPalette,
+    func: Renderer,
+    output: str,
+    background: Image = None,
+    workers: int = None,
+    prepare: Preparer = None,
+) -> Iterator[str]:
+    """Render every image in every palette color, spread across a pool of worker processes
+
+    Each image is sent to a worker along with a group of colors, and the worker saves results as they are made
+    When there are fewer images than workers, each image's colors are split into groups to keep every worker busy
+    Only a few images are queued at a time, so the images can be a lazy iterable
+
+    If a prepare function is given, it runs once per image (per color group) - see render_colors
+    The render and prepare functions must be picklable (eg. defined at the top level of a module)
+
+    Args:
+        images (Iterable[tuple[str, Image]]): (name, Image) pairs to render - see image.load_from_path
+        colors (ColorPalette): Palette of colors to render each image in
+        func (Renderer): Function to render an image in a given color
+        output (str): Output directory
+        background (Image, optional): Background to composite each result onto. Defaults to None.
+        workers (int, optional): Number of worker processes. 1 runs in this process. Defaults to the number of CPUs.
+        prepare (Preparer, optional): Function to do color-independent work once per image. Defaults to None.
+
+    Yields:
+        str: Path to each saved image, in order of completion
+    """
+    os.makedirs(output, exist_ok=True)
+    color_items = list(colors.items())
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        for name, image in images:
+            yield from render_colors(name, image, color_items, func, output, background, prepare)
+        return
+
+    # Split colors into groups if we don't have enough images to go around
+    groups = 1
+    if hasattr(images, "__len__") and len(images) > 0:
+        groups = max(1, min(len(color_items), ceil(workers / len(images))))
+    color_groups = [color_items[i::groups] for i in range(groups)]
+
+    pending = set()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(func, output, background, prepare)) as pool:
+        for name, image in images:
+            for group in color_groups:
+                pending.add(pool.submit(_render_task, name, image, group))
+
+            # Keep a bounded number of tasks queued, so we don't hold every image in memory
+            while len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def stack_images(images: list[Image]) -> np.ndarray:
+    """Stack same-size images into one RGBA array
+
+    Args:
+        images (list[Image]): Images to stack. Converted to RGBA if needed
+
+    Raises:
+        ValueError: If the images are not all the same size
+
+    Returns:
+        np.ndarray: (N, H, W, 4) uint8 array
+    """
+    if len({im.size for im in images}) > 1:
+        raise ValueError("Images must all be the same size to stack")
+    return np.stack([np.asarray(im.convert("RGBA")) for im in images])
+
+
+def color_array(colors: Iterable[Color]) -> np.ndarray:
+    """Convert colors to an (M, 4) RGBA array, with opaque alpha for any RGB colors
+
+    Args:
+        colors (Iterable[Color]): Colors to convert
+
+    Returns:
+        np.ndarray: (M, 4) uint8 array
+    """
+    return np.array([tuple(c)[:4] + (255,) * (4 - len(c)) for c in colors], dtype=np.uint8).reshape(-1, 4)
+
+
+def multiply_tensor(stack: np.ndarray, colors: np.ndarray) -> np.ndarray:
+    """Multiply every stacked image by every color at once
+    Matches channels.multiply exactly
+
+    Args:
+        stack (np.ndarray): (N, H, W, 4) RGBA images - see stack_images
+        colors (np.ndarray): (M, 4) RGBA colors - see color_array
+
+    Returns:
+        np.ndarray: (N, M, H, W, 4) uint8 results
+    """
+    # One lookup table per color and channel, indexed by channel * 256 + value
+    tables = (np.arange(256, dtype=np.uint16) * colors[:, :, None].astype(np.uint16) // 255).astype(np.uint8)
+    index = stack + np.arange(4, dtype=np.intp) * 256
+
+    result = np.empty((stack.shape[0], len(colors)) + stack.shape[1:], dtype=np.uint8)
+    for m, table in enumerate(tables):
+        np.take(table.ravel(), index, out=result[:, m])
+    return result
+
+
+def glow_tensor(mask: GlowMask, colors: np.ndarray) -> np.ndarray:
+    """Apply an outline or glow mask in every color at once
+    Matches GlowMask.apply exactly
+
+    Args:
+        mask (GlowMask): Mask to apply - see outline.outline_mask and outline.neon_mask
+        colors (np.ndarray): (M, 4) RGBA colors - see color_array. Only RGB is used
+
+    Returns:
+        np.ndarray: (M, H, W, 4) uint8 results, at the full image size
+    """
+    rgb = colors[:, None, None, :3]
+    width, height = mask.image.size
+    result = np.asarray(mask.image)
+    for layer in mask.layers:
+        # Each layer is a flat color, with the base image (and any inner layers) composited on top
+        canvas = np.empty((len(colors), height, width, 4), dtype=np.uint8)
+        canvas[..., :3] = rgb
+        canvas[..., 3] = np.asarray(layer)
+        alpha_composite_into(canvas, result)
+        result = canvas
+    result = np.broadcast_to(result, (len(colors), height, width, 4))
+
+    if mask.box is None or mask.image.size == mask.size:
+        return result
+
+    # Everything outside the region is the effect color, fully transparent
+    full = np.zeros((len(colors), mask.size[1], mask.size[0], 4), dtype=np.uint8)
+    full[..., :3] = rgb
+    x, y = mask.box[:2]
+    full[:, y:y + height, x:x + width] = result
+    return full
+
+
+def _chunk_length(count: int, item_bytes: int, memory: int) -> int:
+    """Number of items that fit in a memory budget, always at least one"""
+    return max(1, min(count, memory // max(item_bytes, 1)))
+
+
+def _save_results(
+    results: np.ndarray, names: list[str], cnames: list[str], output: str, background: np.ndarray
+) -> Iterator[str]:
+    """Save an (N, M, H, W, 4) block of results, compositing onto a background first if given"""
+    if background is not None:
+        canvas = np.array(np.broadcast_to(background, results.shape))
+        alpha_composite_into(canvas, results)
+        results = canvas
+
+    for name, row in zip(names, results):
+        for cname, pixels in zip(cnames, row):
+            path = os.path.join(output, f"{name}_{cname}.png")
+            Image.fromarray(pixels, "RGBA").save(path)
+            yield path
+
+
+def _render_tensor_group(
+    group: list[tuple[str, Image]],
+    colors: list[tuple[str, Color]],
+    output: str,
+    mode: str,
+    background: Image,
+    memory: int,
+) -> Iterator[str]:
+    """Render a group of same-size images in every color, in color chunks that fit the memory budget"""
+    names = [name for name, _ in group]
+    width, height = group[0][1].size
+    if background is not None:
+        background = np.asarray(background.convert("RGBA").resize((width, height)))
+
+    # Color-independent work is done once per image, before any colors
+    prepare = TENSOR_MODES[mode]
+    if prepare is None:
+        stack = stack_images([im for _, im in group])
+    else:
+        masks = [prepare(im.convert("RGBA")) for _, im in group]
+
+    step = _chunk_length(len(colors), len(group) * width * height * _TENSOR_PIXEL_BYTES, memory)
+    for start in range(0, len(colors), step):
+        chunk = colors[start:start + step]
+        rgba = color_array(color for _, color in chunk)
+        if prepare is None:
+            results = multiply_tensor(stack, rgba)
+        else:
+            results = np.stack([glow_tensor(mask, rgba) for mask in masks])
+        yield from _save_results(results, names, [cname for cname, _ in chunk], output, background)
+
+
+def run_tensor_batch(
+    images: Iterable[tuple[str, Image]],
+    colors: ColorPalette,
+    output: str,
+    mode: str = "basic",
+    background: Image = None,
+    memory: int = DEFAULT_TENSOR_MEMORY,
+) -> Iterator[str]:
+    """Render every image in every palette color, as a few large array operations instead of one per pair
+
+    Images of the same size are stacked into (N, H, W, 4) arrays and combined with every color at once
+    Groups are sized so that the (N, M, H, W, 4) results fit in the memory budget
+    If a single image in every color doesn't fit, the colors are split into chunks instead
+    Images of different sizes are grouped separately, so mixed inputs still work
+
+    Results are saved as {name}_{color name}.png in the output directory as each chunk finishes,
+    and match run_palette_batch with the equivalent render function exactly
+
+    Args:
+        images (Iterable[tuple[str, Image]]): (name, Image) pairs to render - see image.iter_from_path
+        colors (ColorPalette): Palette of colors to render each image in
+        output (str): Output directory
+        mode (str, optional): One of TENSOR_MODES - basic, neon or outline. Defaults to "basic".
+        background (Image, optional): Background to composite each result onto. Defaults to None.
+        memory (int, optional): Approximate working memory for each chunk, in bytes. Defaults to 256MB.
+
+    Raises:
+        ValueError: If the mode is not one of TENSOR_MODES
+
+    Yields:
+        str: Path to each saved image
+    """
+    if mode not in TENSOR_MODES:
+        raise ValueError(f"Invalid tensor mode: {mode}")
+
+    os.makedirs(output, exist_ok=True)
+    color_items = list(colors.items())
+    groups: dict[tuple[int, int], list[tuple[str, Image]]] = {}
+
+    for name, image in images:
+        group = groups.setdefault(image.size, [])
+        group.append((name, image))
+
+        width, height = image.size
+        limit = memory // max(len(color_items) * width * height * _TENSOR_PIXEL_BYTES, 1)
+        if len(group) >= max(1, limit):
+            yield from _render_tensor_group(group, color_items, output, mode, background, memory)
+            del groups[image.size]
+
+    for group in groups.values():
+        yield from _render_tensor_group(group, color_items, output, mode, background, memory)
@@ -1,9 +1,42 @@
 from theia.color import Color
-from PIL import Image, ImageChops, ImageOps
+from PIL import Image
+from typing import Iterable
+import numpy as np
+
+# Modes the channel functions work on directly - anything else is converted to RGBA first
+NATIVE_MODES = ("L", "LA", "RGB", "RGBA")
+
+_IDENTITY = np.arange(256, dtype=np.uint16)
+
+
+def _native(image: Image) -> Image:
+    """Convert an image to RGBA unless it is already in one of the native modes"""
+    return image if image.mode in NATIVE_MODES else image.convert("RGBA")
+
+
+def _multiply_table(color: Color, bands: int, alpha: bool) -> list[int]:
+    """Build a lookup table for Image.point that multiplies each band by a color component
+
+    Matches ImageChops.multiply exactly (value * component // 255)
+    A three-component color leaves alpha untouched, the same as multiplying by an opaque color
+
+    Args:
+        color (Color): Color to multiply by
+        bands (int): Number of bands in the image (3 or 4)
+        alpha (bool): Whether the last band is alpha, and should be multiplied by the color's alpha
+
+    Returns:
+        list[int]: Lookup table of 256 entries per band
+    """
+    factors = list(color[:3])
+    if bands == 4:
+        factors.append(color[3] if alpha and len(color) > 3 else 255)
+    return (np.outer(factors, _IDENTITY) // 255).ravel().tolist()
 
 
 def invert_with_alpha(im: Image) -> Image:
-    """Invert the RGB values of an image while keeping alpha intact
+    """Invert the color values of an image while keeping alpha intact
+    Works on any mode - modes other than L, LA, RGB and RGBA are converted to RGBA
 
     Args:
         im (Image): Image to invert
@@ -11,17 +44,17 @@ def invert_with_alpha(im: Image) -> Image:
     Returns:
         Image: Inverted image
     """
-    r, g, b, a = im.split()
-    rgb = Image.merge("RGB", (r, g, b))
-    rgb = ImageOps.invert(rgb)
-
-    r2, g2, b2 = rgb.split()
-    return Image.merge("RGBA", (r2, g2, b2, a))
+    im = _native(im)
+    table = [255 - np.arange(256)] * len(im.getbands())
+    if "A" in im.getbands():
+        table[-1] = np.arange(256)
+    return im.point(np.concatenate(table).tolist())
 
 
 def multiply(image: Image, color: Color) -> Image:
     """Multiply an image by a given color
-    Only works with RGBA images - see the below function for RGB
+    RGB and RGBA images are used directly, anything else is converted to RGBA
+    Alpha is only changed if the color has an alpha component
 
     Args:
         image (Image): Base image
@@ -30,13 +63,12 @@ def multiply(image: Image, color: Color) -> Image:
     Returns:
         Image: Base image multiplied by the color
     """
-    full_color_image = Image.new("RGBA", image.size, color)
-    return ImageChops.multiply(image, full_color_image)
+    return multiply_many(image, [color])[0]
 
 
 def multiply_no_alpha(image: Image, color: Color) -> Image:
-    """Multiply an image by a given color
-    Only works with RGB images - see the above function for RGBA
+    """Multiply the color channels of an image by a given color
+    Unlike multiply, alpha is never changed, even if the color has an alpha component
 
     Args:
         image (Image): Base image
@@ -45,20 +77,44 @@ def multiply_no_alpha(image: Image, color: Color) -> Image:
     Returns:
         Image: Base image multiplied by the color
     """
-    full_color_image = Image.new("RGB", image.size, color)
-    return ImageChops.multiply(image, full_color_image)
+    return multiply_many(image, [color], alpha=False)[0]
 
 
-def set_alpha_channel(image: Image, alpha: Image) -> Image:
-    """Override the alpha channel of an image
+def multiply_many(image: Image, colors: Iterable[Color], alpha: bool = True) -> list[Image]:
+    """Multiply an image by each of the given colors
+    The image is converted once, then each color is a single lookup table pass with no intermediate images
 
     Args:
         image (Image): Base image
-        alpha (Image): New alpha channel. Should be in mode 'P'
+        colors (Iterable[Color]): Colors to multiply by
+        alpha (bool, optional): Whether to multiply alpha by the colors' alpha components. Defaults to True.
+
+    Returns:
+        list[Image]: One result for each color, in order
+    """
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    bands = len(image.getbands())
+    return [image.point(_multiply_table(color, bands, alpha)) for color in colors]
+
+
+def set_alpha_channel(image: Image, alpha: Image, in_place: bool = False) -> Image:
+    """Override the alpha channel of an image
+
+    Args:
+        image (Image): Base image. Converted to RGBA if needed
+        alpha (Image): New alpha channel, in any mode - it is converted to 'L'
+        in_place (bool, optional): Modify the base image instead of a copy. Only for RGBA images. Defaults to False.
 
     Returns:
         Image: Base image with overriden alpha channel
     """
-    r, g, b, _ = image.split()
-    a = alpha.convert("L")
-    return Image.merge("RGBA", (r, g, b, a))
+    if image.mode != "RGBA":
+        if in_place:
+            raise ValueError("Alpha can only be replaced in place on RGBA images")
+        image = image.convert("RGBA")
+    elif not in_place:
+        image = image.copy()
+
+    image.putalpha(alpha.convert("L"))
+    return image
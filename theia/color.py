@@ -1,11 +1,50 @@
 from typing import Callable, Union
-from math import cos, floor, pi
+from math import floor, pi
 from random import random
-from PIL import Image, ImageColor, ImageDraw
+from PIL import Image, ImageColor
+import numpy as np
 
 Color = tuple[int, int, int]
 Gradient = dict[float, Color]
 
+# sRGB (D65) to CIE XYZ conversion matrix, and the reference white used for CIELAB
+SRGB_TO_XYZ = np.array(
+    [
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ]
+)
+XYZ_TO_SRGB = np.linalg.inv(SRGB_TO_XYZ)
+D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+# OKLab conversion matrices - see https://bottosson.github.io/posts/oklab/
+LINEAR_TO_LMS = np.array(
+    [
+        [0.4122214708, 0.5363325363, 0.0514459929],
+        [0.2119034982, 0.6806995451, 0.1073969566],
+        [0.0883024619, 0.2817188376, 0.6299787005],
+    ]
+)
+LMS_TO_OKLAB = np.array(
+    [
+        [0.2104542553, 0.7936177850, -0.0040720468],
+        [1.9779984951, -2.4285922050, 0.4505937099],
+        [0.0259040371, 0.7827717662, -0.8086757660],
+    ]
+)
+LMS_TO_LINEAR = np.linalg.inv(LINEAR_TO_LMS)
+OKLAB_TO_LMS = np.linalg.inv(LMS_TO_OKLAB)
+
+# Directions available for gradient images - see gradient_positions
+GRADIENT_DIRECTIONS = ("horizontal", "vertical", "radial", "angular", "diamond")
+
+# Methods available for dominant color extraction
+DOMINANT_COLOR_METHODS = ("median-cut", "octree", "kmeans")
+
+# Images are subsampled to roughly this many pixels before dominant color extraction
+DOMINANT_COLOR_SAMPLES = 256 * 256
+
 
 def clamp(val: float) -> int:
     """Clamp a number to that expected by a reasonable RGB component
@@ -80,9 +119,71 @@ def interpolate(
     return linear_interpolate(color1, color2, f(p))
 
 
+def cosine_palette(
+    a: Color, b: Color, c: Color, d: Color, t: Union[float, np.ndarray]
+) -> np.ndarray:
+    """Evaluate a cosine palette at any number of t values at once
+    color(t) = a + b * cos(2 * pi * (c * t + d)), with each parameter scaled from 0..255 to 0..1
+
+    See:
+    https://iquilezles.org/www/articles/palettes/palettes.htm
+
+    Parameters can also be arrays of shape (..., 3), to evaluate several palettes at once
+    These are broadcast against t, eg. parameters of shape (p, 1, 3) and t of shape (n,) give (p, n, 3)
+
+    Args:
+        a (Color): Color for parameter A
+        b (Color): Color for parameter B
+        c (Color): Color for parameter C
+        d (Color): Color for parameter D
+        t (float | np.ndarray): T value(s) to evaluate the cosine palette at
+
+    Returns:
+        np.ndarray: Colors, of shape t.shape + (3,) (uint8)
+    """
+    a, b, c, d = (np.asarray(p, dtype=np.float64)[..., :3] / 255 for p in (a, b, c, d))
+    t = np.asarray(t, dtype=np.float64)[..., None]
+    colors = a + b * np.cos(2 * pi * (c * t + d))
+    return np.floor(np.clip(colors * 255, 0, 255)).astype(np.uint8)
+
+
+def cosine_palette_image(a: Color, b: Color, c: Color, d: Color, size: tuple[int, int]) -> Image:
+    """Render a cosine palette to an image strip, running left to right from t=0 to t=1
+
+    Args:
+        a (Color): Color for parameter A
+        b (Color): Color for parameter B
+        c (Color): Color for parameter C
+        d (Color): Color for parameter D
+        size (tuple[int, int]): Image dimensions
+
+    Returns:
+        Image: Palette image (RGB)
+    """
+    row = cosine_palette(a, b, c, d, np.arange(size[0]) / max(size[0] - 1, 1))
+    return Image.fromarray(np.ascontiguousarray(np.broadcast_to(row, (size[1], size[0], 3))), "RGB")
+
+
+def cosine_palette_lut(a: Color, b: Color, c: Color, d: Color, size: int = 256) -> "GradientLUT":
+    """Compile a cosine palette into a GradientLUT, for fast sampling and colormapping
+
+    Args:
+        a (Color): Color for parameter A
+        b (Color): Color for parameter B
+        c (Color): Color for parameter C
+        d (Color): Color for parameter D
+        size (int, optional): Number of entries in the table. Defaults to 256.
+
+    Returns:
+        GradientLUT: Compiled palette
+    """
+    return GradientLUT.from_table(cosine_palette(a, b, c, d, np.linspace(0, 1, size)))
+
+
 def interpolate_cosine(a: Color, b: Color, c: Color, d: Color, t: Union[float, list[float]]
                        ) -> Union[Color, list[Color]]:
     """Given four input parameters, generate a cosine-interpolated value
+    See cosine_palette for evaluating many values at once as an array
 
     See:
     https://iquilezles.org/www/articles/palettes/palettes.htm
@@ -95,23 +196,13 @@ def interpolate_cosine(a: Color, b: Color, c: Color, d: Color, t: Union[float, l
         t (float | list[float]): T value(s) to evaluate the cosine gradient at
 
     Returns:
-        Color | list[Color]: [description]
+        Color | list[Color]: Color for each T value
     """
-    a = tuple(v / 255 for v in a)
-    b = tuple(v / 255 for v in b)
-    c = tuple(v / 255 for v in c)
-    d = tuple(v / 255 for v in d)
-
-    def cosine_step(t: float):
-        rr = a[0] + b[0] * cos(2 * pi * (c[0] * t + d[0]))
-        gg = a[0] + b[0] * cos(2 * pi * (c[0] * t + d[0]))
-        bb = a[0] + b[0] * cos(2 * pi * (c[0] * t + d[0]))
-        return tidy_color(rr * 255, gg * 255, bb * 255)
-
-    if isinstance(t, list):
-        return [cosine_step(t_value) for t_value in t]
+    colors = cosine_palette(a, b, c, d, t)
+    if np.ndim(t) == 0:
+        return tuple(int(v) for v in colors)
     else:
-        return cosine_step(t)
+        return [tuple(int(v) for v in color) for color in colors]
 
 
 def gradient(stops: Gradient, t: float) -> Color:
@@ -138,16 +229,57 @@ def gradient(stops: Gradient, t: float) -> Color:
     return list(stops.values())[-1]
 
 
-def random_from_gradient(stops: Gradient) -> Color:
+def gradient_array(
+    stops: Gradient, t: Union[float, np.ndarray], f: Callable[[np.ndarray], np.ndarray] = None
+) -> np.ndarray:
+    """Vectorized version of gradient, evaluating any number of t values at once
+    Stops are sorted and looked up with a binary search, so this is fast for large arrays and many stops
+    t values outside the range of the stops are clamped to the first or last color
+
+    Args:
+        stops (Gradient): Dict of gradient stops {float: Color}
+        t (float | np.ndarray): Position(s) of the gradient, of any shape
+        f (Callable[[np.ndarray], np.ndarray], optional): Interpolation function, applied between each pair of stops.
+            Should map 0..1 to 0..1 and work on arrays. Defaults to None (linear).
+
+    Returns:
+        np.ndarray: Interpolated colors, of shape t.shape + (3,) (uint8)
+    """
+    positions = np.array(sorted(stops), dtype=np.float64)
+    colors = np.array([stops[p] for p in positions], dtype=np.float64)[:, :3]
+    t = np.asarray(t, dtype=np.float64)
+    if len(positions) == 1:
+        return np.broadcast_to(colors[0].astype(np.uint8), t.shape + (3,)).copy()
+
+    t = np.clip(t, positions[0], positions[-1])
+    lower = np.clip(np.searchsorted(positions, t) - 1, 0, len(positions) - 2)
+
+    d = (t - positions[lower]) / np.diff(positions)[lower]
+    if f is not None:
+        d = f(d)
+
+    # One channel at a time, to avoid gathering large (..., 3) float arrays
+    result = np.empty(t.shape + (3,), dtype=np.uint8)
+    steps = np.diff(colors, axis=0)
+    for c in range(3):
+        channel = colors[lower, c] + steps[lower, c] * d
+        result[..., c] = np.floor(channel).clip(0, 255)
+    return result
+
+
+def random_from_gradient(stops: Union[Gradient, "GradientLUT"]) -> Color:
     """Gradient utility function
     Will return a random colour at some point on the given gradient
+    For sampling the same gradient many times, pass a GradientLUT instead of the stops
 
     Args:
-        stops (Gradient): Dict of gradient stops {float: Color}
+        stops (Gradient | GradientLUT): Dict of gradient stops {float: Color}, or a compiled gradient
 
     Returns:
         Color: Randomly sampled color value
     """
+    if isinstance(stops, GradientLUT):
+        return stops.sample(random())
     return gradient(stops, random())
 
 
@@ -177,25 +309,189 @@ def parse_gradient_string(string: str) -> Gradient:
     return linspace_gradient([ImageColor.getrgb(c.strip()) for c in string.split(",")])
 
 
-def gradient_image(stops: Gradient, size: tuple[int, int]) -> Image:
+def gradient_positions(size: tuple[int, int], direction: str = "horizontal") -> np.ndarray:
+    """Get the 0..1 position of every pixel in a gradient image
+
+    Supported directions:
+        horizontal  -- Left to right
+        vertical    -- Top to bottom
+        radial      -- Center outwards, reaching 1 at the corners
+        angular     -- Clockwise around the center, starting from the right
+        diamond     -- Center outwards in a diamond shape, reaching 1 at the corners
+
+    Args:
+        size (tuple[int, int]): Image dimensions
+        direction (str, optional): Gradient direction. Defaults to "horizontal".
+
+    Raises:
+        ValueError: If the direction is not recognised
+
+    Returns:
+        np.ndarray: Array of positions, of shape (height, width)
+    """
+    if direction not in GRADIENT_DIRECTIONS:
+        raise ValueError(f"Unknown gradient direction: {direction}")
+
+    w, h = size
+    if direction == "horizontal":
+        return np.broadcast_to(np.arange(w) / max(w - 1, 1), (h, w))
+    elif direction == "vertical":
+        return np.broadcast_to((np.arange(h) / max(h - 1, 1))[:, None], (h, w))
+
+    # Offsets from the center of the image
+    cx = (w - 1) / 2
+    cy = (h - 1) / 2
+    dx = (np.arange(w) - cx)[None, :]
+    dy = (np.arange(h) - cy)[:, None]
+    if direction == "radial":
+        return np.hypot(dx, dy) / (np.hypot(cx, cy) or 1)
+    elif direction == "angular":
+        return (np.arctan2(dy, dx) / (2 * pi)) % 1
+    else:
+        return (np.abs(dx) + np.abs(dy)) / ((cx + cy) or 1)
+
+
+def gradient_image(
+    stops: Gradient,
+    size: tuple[int, int],
+    direction: str = "horizontal",
+    f: Callable[[np.ndarray], np.ndarray] = None,
+) -> Image:
     """Generate an image from gradient stops
-    This image will always run Left to Right
-    For different directions, use Image.rotate on the result
+    See gradient_positions for the supported directions
 
     Args:
         stops (dict[float, Color]): Gradient stops
         size (tuple[int, int]): Image dimensions
+        direction (str, optional): Gradient direction. Defaults to "horizontal".
+        f (Callable[[np.ndarray], np.ndarray], optional): Interpolation function - see gradient_array.
+
     Returns:
         Image: Gradient image (RGBA)
     """
-    canvas = Image.new("RGBA", size)
-    draw = ImageDraw.Draw(canvas)
+    t = gradient_positions(size, direction)
+    if direction in ("horizontal", "vertical"):
+        # Every row (or column) is the same, so only evaluate the gradient once
+        axis = 0 if direction == "horizontal" else 1
+        rgb = np.broadcast_to(gradient_array(stops, t.take([0], axis=axis), f), t.shape + (3,))
+    else:
+        rgb = gradient_array(stops, t, f)
+
+    pixels = np.empty(t.shape + (4,), dtype=np.uint8)
+    pixels[..., :3] = rgb
+    pixels[..., 3] = 255
+    return Image.fromarray(pixels, "RGBA")
+
+
+class GradientLUT:
+    """A gradient compiled into a fixed-size lookup table
+
+    Sampling is then just an array lookup, instead of searching the stops for every sample
+    Positions are rounded to the nearest table entry, so 256 or 1024 entries is plenty for 8-bit colors
+    """
+
+    def __init__(self, stops: Gradient, size: int = 256, f: Callable[[np.ndarray], np.ndarray] = None):
+        """Compile a gradient into a lookup table
+
+        Args:
+            stops (Gradient): Dict of gradient stops {float: Color}
+            size (int, optional): Number of entries in the table. Defaults to 256.
+            f (Callable[[np.ndarray], np.ndarray], optional): Interpolation function - see gradient_array.
+
+        Raises:
+            ValueError: If the table has fewer than two entries
+        """
+        if size < 2:
+            raise ValueError("Gradient LUT must have at least two entries")
+        self._set_table(gradient_array(stops, np.linspace(0, 1, size), f))
+
+    @classmethod
+    def from_table(cls, table: np.ndarray) -> "GradientLUT":
+        """Create a LUT from precomputed colors, eg. from cosine_palette
+
+        Args:
+            table (np.ndarray): Colors at evenly spaced positions from 0 to 1, of shape (size, 3)
+
+        Raises:
+            ValueError: If the table has fewer than two entries
+
+        Returns:
+            GradientLUT: Compiled gradient
+        """
+        if len(table) < 2:
+            raise ValueError("Gradient LUT must have at least two entries")
+        lut = cls.__new__(cls)
+        lut._set_table(np.asarray(table, dtype=np.uint8)[:, :3])
+        return lut
+
+    def _set_table(self, table: np.ndarray):
+        self.size = len(table)
+        self.table = table
+
+        # Map grayscale values directly to colors, for use as a colormap
+        self.gray_table = self.table[np.rint(np.arange(256) * (self.size - 1) / 255).astype(np.intp)]
+
+    def indexes(self, t: Union[float, np.ndarray]) -> np.ndarray:
+        """Get the table index for each position, clamped to the table
+
+        Args:
+            t (float | np.ndarray): 0..1 position(s) of the gradient
+
+        Returns:
+            np.ndarray: Table indexes
+        """
+        return np.rint(np.clip(t, 0, 1) * (self.size - 1)).astype(np.intp)
+
+    def sample(self, t: float) -> Color:
+        """Get the color at a single position of the gradient
+
+        Args:
+            t (float): 0..1 position of the gradient
+
+        Returns:
+            Color: Color at that position
+        """
+        return tuple(int(v) for v in self.table[int(self.indexes(t))])
+
+    def sample_many(self, t: np.ndarray) -> np.ndarray:
+        """Get the colors at any number of positions of the gradient
+
+        Args:
+            t (np.ndarray): 0..1 positions of the gradient, of any shape
 
-    for i in range(size[0]):
-        t = i / (size[0] - 1)
-        color = gradient(stops, t)
-        draw.line((i, 0, i, size[1]), fill=color)
-    return canvas
+        Returns:
+            np.ndarray: Colors, of shape t.shape + (3,) (uint8)
+        """
+        return self.table[self.indexes(t)]
+
+    def random(self, n: int, seed: int = None) -> np.ndarray:
+        """Get colors from random positions of the gradient - see random_from_gradient
+
+        Args:
+            n (int): Number of colors
+            seed (int, optional): Random seed. Defaults to None.
+
+        Returns:
+            np.ndarray: Array of n random colors (uint8)
+        """
+        return self.table[np.random.default_rng(seed).integers(0, self.size, n)]
+
+    def apply(self, image: Image) -> Image:
+        """Map an image through the gradient, like a colormap
+        Black maps to the start of the gradient, and white to the end
+        Any transparency in the image is kept
+
+        Args:
+            image (Image): Image to map. Converted to grayscale first.
+
+        Returns:
+            Image: Mapped image (RGBA)
+        """
+        gray = np.asarray(image.convert("L"))
+        pixels = np.empty(gray.shape + (4,), dtype=np.uint8)
+        pixels[..., :3] = self.gray_table[gray]
+        pixels[..., 3] = np.asarray(image.getchannel("A")) if "A" in image.getbands() else 255
+        return Image.fromarray(pixels, "RGBA")
 
 
 def color_image(color: Color, size: tuple[int, int]) -> Image:
@@ -248,3 +544,475 @@ def distance_manhattan(c1: Color, c2: Color) -> int:
         int: Distance between the two colors
     """
     return abs(c1[0] - c2[0]) + abs(c1[1] - c2[1]) + abs(c1[2] - c2[2])
+
+
+def _srgb_to_linear_value(c: np.ndarray) -> np.ndarray:
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+
+
+# Linear values for every 8-bit sRGB component, so integer inputs can skip the power function
+SRGB_TO_LINEAR_TABLE = _srgb_to_linear_value(np.arange(256) / 255)
+
+
+def srgb_to_linear(colors: np.ndarray) -> np.ndarray:
+    """Convert an array of sRGB colors (0..255) into linear RGB (0..1)
+
+    Args:
+        colors (np.ndarray): Array of colors, with shape (..., 3)
+
+    Returns:
+        np.ndarray: Linear RGB values, with shape (..., 3)
+    """
+    colors = np.asarray(colors)
+    if np.issubdtype(colors.dtype, np.integer):
+        return SRGB_TO_LINEAR_TABLE[np.clip(colors, 0, 255)]
+    return _srgb_to_linear_value(colors / 255)
+
+
+def linear_to_srgb(linear: np.ndarray) -> np.ndarray:
+    """Convert an array of linear RGB colors (0..1) into sRGB (0..255)
+    Values are not rounded or clamped - use np.clip(np.rint(srgb), 0, 255) for displayable colors
+
+    Args:
+        linear (np.ndarray): Array of linear RGB values, with shape (..., 3)
+
+    Returns:
+        np.ndarray: sRGB values, with shape (..., 3)
+    """
+    linear = np.asarray(linear, dtype=np.float64)
+    srgb = np.where(linear <= 0.0031308, linear * 12.92, 1.055 * np.abs(linear) ** (1 / 2.4) - 0.055)
+    return srgb * 255
+
+
+def linear_to_xyz(linear: np.ndarray) -> np.ndarray:
+    """Convert an array of linear RGB colors into CIE XYZ
+
+    Args:
+        linear (np.ndarray): Array of linear RGB values, with shape (..., 3)
+
+    Returns:
+        np.ndarray: XYZ values, with shape (..., 3)
+    """
+    return np.asarray(linear) @ SRGB_TO_XYZ.T
+
+
+def xyz_to_linear(xyz: np.ndarray) -> np.ndarray:
+    """Convert an array of CIE XYZ colors into linear RGB
+
+    Args:
+        xyz (np.ndarray): Array of XYZ values, with shape (..., 3)
+
+    Returns:
+        np.ndarray: Linear RGB values, with shape (..., 3)
+    """
+    return np.asarray(xyz) @ XYZ_TO_SRGB.T
+
+
+def xyz_to_lab(xyz: np.ndarray) -> np.ndarray:
+    """Convert an array of CIE XYZ colors into CIELAB, using a D65 white point
+
+    Args:
+        xyz (np.ndarray): Array of XYZ values, with shape (..., 3)
+
+    Returns:
+        np.ndarray: Lab values, with shape (..., 3)
+    """
+    t = np.asarray(xyz) / D65_WHITE
+    delta = 6 / 29
+    f = np.where(t > delta ** 3, np.cbrt(t), t / (3 * delta ** 2) + 4 / 29)
+    return np.stack(
+        (116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])),
+        axis=-1,
+    )
+
+
+def lab_to_xyz(lab: np.ndarray) -> np.ndarray:
+    """Convert an array of CIELAB colors into CIE XYZ, using a D65 white point
+
+    Args:
+        lab (np.ndarray): Array of Lab values, with shape (..., 3)
+
+    Returns:
+        np.ndarray: XYZ values, with shape (..., 3)
+    """
+    lab = np.asarray(lab, dtype=np.float64)
+    fy = (lab[..., 0] + 16) / 116
+    f = np.stack((fy + lab[..., 1] / 500, fy, fy - lab[..., 2] / 200), axis=-1)
+    delta = 6 / 29
+    t = np.where(f > delta, f ** 3, 3 * delta ** 2 * (f - 4 / 29))
+    return t * D65_WHITE
+
+
+def linear_to_oklab(linear: np.ndarray) -> np.ndarray:
+    """Convert an array of linear RGB colors into OKLab
+
+    Args:
+        linear (np.ndarray): Array of linear RGB values, with shape (..., 3)
+
+    Returns:
+        np.ndarray: OKLab values, with shape (..., 3)
+    """
+    lms = np.cbrt(np.asarray(linear) @ LINEAR_TO_LMS.T)
+    return lms @ LMS_TO_OKLAB.T
+
+
+def oklab_to_linear(oklab: np.ndarray) -> np.ndarray:
+    """Convert an array of OKLab colors into linear RGB
+
+    Args:
+        oklab (np.ndarray): Array of OKLab values, with shape (..., 3)
+
+    Returns:
+        np.ndarray: Linear RGB values, with shape (..., 3)
+    """
+    lms = (np.asarray(oklab) @ OKLAB_TO_LMS.T) ** 3
+    return lms @ LMS_TO_LINEAR.T
+
+
+def rgb_to_lab(colors: np.ndarray) -> np.ndarray:
+    """Convert an array of sRGB colors (0..255) into CIELAB
+
+    Args:
+        colors (np.ndarray): Array of colors, with shape (..., 3)
+
+    Returns:
+        np.ndarray: Lab values, with shape (..., 3)
+    """
+    return xyz_to_lab(linear_to_xyz(srgb_to_linear(colors)))
+
+
+def lab_to_rgb(lab: np.ndarray) -> np.ndarray:
+    """Convert an array of CIELAB colors into sRGB (0..255)
+
+    Args:
+        lab (np.ndarray): Array of Lab values, with shape (..., 3)
+
+    Returns:
+        np.ndarray: sRGB values, with shape (..., 3)
+    """
+    return linear_to_srgb(xyz_to_linear(lab_to_xyz(lab)))
+
+
+def rgb_to_oklab(colors: np.ndarray) -> np.ndarray:
+    """Convert an array of sRGB colors (0..255) into OKLab
+
+    Args:
+        colors (np.ndarray): Array of colors, with shape (..., 3)
+
+    Returns:
+        np.ndarray: OKLab values, with shape (..., 3)
+    """
+    return linear_to_oklab(srgb_to_linear(colors))
+
+
+def oklab_to_rgb(oklab: np.ndarray) -> np.ndarray:
+    """Convert an array of OKLab colors into sRGB (0..255)
+
+    Args:
+        oklab (np.ndarray): Array of OKLab values, with shape (..., 3)
+
+    Returns:
+        np.ndarray: sRGB values, with shape (..., 3)
+    """
+    return linear_to_srgb(oklab_to_linear(oklab))
+
+
+def delta_e_2000(lab1: np.ndarray, lab2: np.ndarray) -> np.ndarray:
+    """Get the CIEDE2000 color difference between arrays of CIELAB colors
+    Inputs are broadcast against each other
+
+    See:
+    http://www2.ece.rochester.edu/~gsharma/ciede2000/ciede2000noteCRNA.pdf
+
+    Args:
+        lab1 (np.ndarray): First array of Lab values, with shape (..., 3)
+        lab2 (np.ndarray): Second array of Lab values, with shape (..., 3)
+
+    Returns:
+        np.ndarray: Color differences, with the broadcast shape of the inputs (minus the last axis)
+    """
+    lab1 = np.asarray(lab1, dtype=np.float64)
+    lab2 = np.asarray(lab2, dtype=np.float64)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    # Adjust a* to compensate for neutral colors
+    c_bar7 = ((np.hypot(a1, b1) + np.hypot(a2, b2)) / 2) ** 7
+    g = 0.5 * (1 - np.sqrt(c_bar7 / (c_bar7 + 25 ** 7)))
+    a1 = a1 * (1 + g)
+    a2 = a2 * (1 + g)
+    c1 = np.hypot(a1, b1)
+    c2 = np.hypot(a2, b2)
+    h1 = np.degrees(np.arctan2(b1, a1)) % 360
+    h2 = np.degrees(np.arctan2(b2, a2)) % 360
+
+    # Differences in lightness, chroma and hue
+    chroma_zero = (c1 * c2) == 0
+    dh = h2 - h1
+    dh = np.where(dh > 180, dh - 360, np.where(dh < -180, dh + 360, dh))
+    dh = np.where(chroma_zero, 0, dh)
+    dL = L2 - L1
+    dC = c2 - c1
+    dH = 2 * np.sqrt(c1 * c2) * np.sin(np.radians(dh / 2))
+
+    # Means of lightness, chroma and hue
+    L_bar = (L1 + L2) / 2
+    c_bar = (c1 + c2) / 2
+    h_sum = h1 + h2
+    h_bar = np.where(
+        np.abs(h1 - h2) <= 180, h_sum / 2, np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2)
+    )
+    h_bar = np.where(chroma_zero, h_sum, h_bar)
+
+    # Weighting functions
+    t = (
+        1
+        - 0.17 * np.cos(np.radians(h_bar - 30))
+        + 0.24 * np.cos(np.radians(2 * h_bar))
+        + 0.32 * np.cos(np.radians(3 * h_bar + 6))
+        - 0.20 * np.cos(np.radians(4 * h_bar - 63))
+    )
+    d_theta = 30 * np.exp(-(((h_bar - 275) / 25) ** 2))
+    c_bar7 = c_bar ** 7
+    r_c = 2 * np.sqrt(c_bar7 / (c_bar7 + 25 ** 7))
+    s_l = 1 + (0.015 * (L_bar - 50) ** 2) / np.sqrt(20 + (L_bar - 50) ** 2)
+    s_c = 1 + 0.045 * c_bar
+    s_h = 1 + 0.015 * c_bar * t
+    r_t = -np.sin(np.radians(2 * d_theta)) * r_c
+
+    return np.sqrt(
+        (dL / s_l) ** 2 + (dC / s_c) ** 2 + (dH / s_h) ** 2 + r_t * (dC / s_c) * (dH / s_h)
+    )
+
+
+def distance_lab(c1: Color, c2: Color) -> float:
+    """Get the CIE76 distance (Euclidean distance in CIELAB) between two colors
+
+    Args:
+        c1 (Color): First color
+        c2 (Color): Second color
+
+    Returns:
+        float: Distance between the two colors
+    """
+    lab = rgb_to_lab(np.array([c1[:3], c2[:3]]))
+    return float(np.linalg.norm(lab[0] - lab[1]))
+
+
+def distance_oklab(c1: Color, c2: Color) -> float:
+    """Get the Euclidean distance in OKLab between two colors
+
+    Args:
+        c1 (Color): First color
+        c2 (Color): Second color
+
+    Returns:
+        float: Distance between the two colors
+    """
+    oklab = rgb_to_oklab(np.array([c1[:3], c2[:3]]))
+    return float(np.linalg.norm(oklab[0] - oklab[1]))
+
+
+def distance_ciede2000(c1: Color, c2: Color) -> float:
+    """Get the CIEDE2000 distance between two colors
+
+    Args:
+        c1 (Color): First color
+        c2 (Color): Second color
+
+    Returns:
+        float: Distance between the two colors
+    """
+    lab = rgb_to_lab(np.array([c1[:3], c2[:3]]))
+    return float(delta_e_2000(lab[0], lab[1]))
+
+
+def color_histogram(
+    image: Image, bits: int = 5, max_pixels: int = DOMINANT_COLOR_SAMPLES
+) -> tuple[np.ndarray, np.ndarray]:
+    """Build a histogram of the colors in an image
+    Colors are grouped into buckets with the given bits per channel, and fully transparent pixels are ignored
+
+    Large images are subsampled (without blending colors) to roughly max_pixels first
+
+    Args:
+        image (Image): Image to build a histogram for
+        bits (int, optional): Bits per channel for each bucket. Defaults to 5.
+        max_pixels (int, optional): Maximum number of pixels to sample. Defaults to 65536.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Mean color of each non-empty bucket (n, 3), and the pixel count of each (n,)
+    """
+    scale = (max_pixels / (image.width * image.height)) ** 0.5
+    if scale < 1:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.NEAREST)
+
+    pixels = np.asarray(image.convert("RGBA")).reshape(-1, 4)
+    pixels = pixels[pixels[:, 3] > 0, :3].astype(np.int64)
+
+    shift = 8 - bits
+    keys = ((pixels[:, 0] >> shift) << (2 * bits)) | ((pixels[:, 1] >> shift) << bits) | (pixels[:, 2] >> shift)
+    counts = np.bincount(keys, minlength=1 << (3 * bits))
+    sums = np.stack([np.bincount(keys, weights=pixels[:, i], minlength=len(counts)) for i in range(3)], axis=-1)
+
+    occupied = counts > 0
+    return sums[occupied] / counts[occupied, None], counts[occupied]
+
+
+def _median_cut(colors: np.ndarray, counts: np.ndarray, k: int) -> list[np.ndarray]:
+    """Split histogram buckets into k groups by repeatedly halving the group with the widest color range"""
+    boxes = [np.arange(len(colors))]
+    while len(boxes) < k:
+        # Pick the box with the largest range along any channel, weighted by population
+        scores = [np.ptp(colors[box], axis=0).max() * counts[box].sum() if len(box) > 1 else -1 for box in boxes]
+        best = int(np.argmax(scores))
+        if scores[best] <= 0:
+            break
+
+        # Split at the weighted median along the widest channel
+        box = boxes.pop(best)
+        channel = np.ptp(colors[box], axis=0).argmax()
+        box = box[np.argsort(colors[box, channel], kind="stable")]
+        cumulative = np.cumsum(counts[box])
+        split = int(np.searchsorted(cumulative, cumulative[-1] / 2)) + 1
+        split = min(split, len(box) - 1)
+        boxes.extend([box[:split], box[split:]])
+    return boxes
+
+
+def _octree(colors: np.ndarray, counts: np.ndarray, k: int, bits: int) -> list[np.ndarray]:
+    """Group histogram buckets into k octree nodes, merging the least popular deepest nodes first"""
+    nodes = np.floor(colors).astype(np.int64) >> (8 - bits)
+    depth = np.full(len(colors), bits)
+
+    def node_keys(nodes: np.ndarray, depth: np.ndarray) -> np.ndarray:
+        # Pack each (depth, r, g, b) node into one integer, so nodes can be compared without sorting rows
+        return (((depth << bits | nodes[:, 0]) << bits | nodes[:, 1]) << bits) | nodes[:, 2]
+
+    def node_groups():
+        _, groups = np.unique(node_keys(nodes, depth), return_inverse=True)
+        return groups.ravel()
+
+    while (excess := node_groups().max() + 1 - k) > 0:
+        deepest = depth.max()
+        if deepest == 0:
+            break
+        at_depth = np.flatnonzero(depth == deepest)
+        parents, inverse = np.unique(node_keys(nodes[at_depth] >> 1, depth[at_depth] - 1), return_inverse=True)
+        inverse = inverse.ravel()
+
+        # Merging a parent replaces all of its distinct children with one node
+        children = np.unique(node_keys(nodes[at_depth], depth[at_depth]) + (inverse << (3 * bits + 4)))
+        reduction = np.bincount(children >> (3 * bits + 4), minlength=len(parents)) - 1
+        population = np.bincount(inverse, weights=counts[at_depth], minlength=len(parents))
+
+        # Merge the least popular parents, as long as they don't leave fewer than k nodes
+        order = np.argsort(population, kind="stable")
+        fits = np.flatnonzero(reduction[order] <= excess)
+        if len(fits) == 0:
+            break
+        within = np.cumsum(reduction[order[fits]]) <= excess
+        # The least popular parent that fits is always merged, even if an earlier one was too large
+        within[0] = True
+        merged = np.zeros(len(parents), dtype=bool)
+        merged[order[fits[within]]] = True
+
+        selected = at_depth[merged[inverse]]
+        nodes[selected] >>= 1
+        depth[selected] -= 1
+
+    groups = node_groups()
+    populations = np.bincount(groups, weights=counts)
+    if len(populations) > k:
+        # Any merge would leave too few colors - fold the least popular nodes into their nearest neighbour instead
+        means = np.stack([np.bincount(groups, weights=colors[:, i] * counts) for i in range(3)], -1)
+        means /= populations[:, None]
+        keep = np.argsort(populations, kind="stable")[::-1][:k]
+        nearest = ((means[:, None, :] - means[None, keep, :]) ** 2).sum(axis=2).argmin(axis=1)
+        groups = nearest[groups]
+    return [np.flatnonzero(groups == g) for g in range(groups.max() + 1)]
+
+
+def _kmeans(
+    colors: np.ndarray, counts: np.ndarray, k: int, seed: int, iterations: int = 50, batch_size: int = 1024
+) -> list[np.ndarray]:
+    """Group histogram buckets with weighted mini-batch k-means"""
+    rng = np.random.default_rng(seed)
+    weights = counts / counts.sum()
+
+    # k-means++ initialisation, weighted by population
+    centers = [colors[rng.choice(len(colors), p=weights)]]
+    for _ in range(1, k):
+        distances = ((colors[:, None, :] - np.array(centers)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        probability = weights * distances
+        if probability.sum() <= 0:
+            break
+        centers.append(colors[rng.choice(len(colors), p=probability / probability.sum())])
+    centers = np.array(centers)
+
+    # Mini-batch updates - each center moves towards its batch mean, by less as it sees more samples
+    seen = np.zeros(len(centers))
+    for _ in range(iterations):
+        batch = colors[rng.choice(len(colors), size=batch_size, p=weights)]
+        labels = ((batch[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        batch_counts = np.bincount(labels, minlength=len(centers))
+        batch_sums = np.stack([np.bincount(labels, weights=batch[:, i], minlength=len(centers)) for i in range(3)], -1)
+
+        seen += batch_counts
+        updated = batch_counts > 0
+        rate = batch_counts[updated] / seen[updated]
+        centers[updated] += rate[:, None] * (batch_sums[updated] / batch_counts[updated, None] - centers[updated])
+
+    labels = ((colors[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    return [group for c in range(len(centers)) if len(group := np.flatnonzero(labels == c)) > 0]
+
+
+def dominant_colors(image: Image, k: int = 5, method: str = "median-cut", seed: int = 0) -> list[tuple[Color, float]]:
+    """Find the dominant colors in an image
+
+    Colors are extracted from a subsampled histogram, so this is fast even for large images
+
+    Supported methods:
+        median-cut  -- Repeatedly split the color range at the median
+        octree      -- Merge the least popular branches of a color octree
+        kmeans      -- Weighted mini-batch k-means clustering, seeded for repeatable results
+
+    Args:
+        image (Image): Image to find the dominant colors of
+        k (int, optional): Maximum number of colors to find. Defaults to 5.
+        method (str, optional): Extraction method. Defaults to "median-cut".
+        seed (int, optional): Random seed for k-means. Defaults to 0.
+
+    Raises:
+        ValueError: If the method is not recognised, or k is less than 1
+
+    Returns:
+        list[tuple[Color, float]]: (color, share of pixels) pairs, most common first
+    """
+    if method not in DOMINANT_COLOR_METHODS:
+        raise ValueError(f"Unknown dominant color method: {method}")
+    if k < 1:
+        raise ValueError("k must be at least 1")
+
+    bits = 5
+    colors, counts = color_histogram(image, bits=bits)
+    if len(colors) == 0:
+        return []
+
+    if len(colors) <= k:
+        groups = [np.array([i]) for i in range(len(colors))]
+    elif method == "median-cut":
+        groups = _median_cut(colors, counts, k)
+    elif method == "octree":
+        groups = _octree(colors, counts, k, bits)
+    else:
+        groups = _kmeans(colors, counts, k, seed)
+
+    total = counts.sum()
+    result = []
+    for group in groups:
+        population = counts[group].sum()
+        mean = (colors[group] * counts[group, None]).sum(axis=0) / population
+        result.append((tidy_color(np.rint(mean)), float(population / total)))
+    return sorted(result, key=lambda x: x[1], reverse=True)
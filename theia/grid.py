@@ -1,8 +1,10 @@
 import argparse
 import math
-from typing import Callable
+import random
+from typing import Callable, Iterator, Union
 from PIL import Image, ImageDraw
-from random import randrange, random, choice, shuffle
+from random import Random, randrange, choice
+import numpy as np
 
 # Typings
 Point = tuple[int, int]
@@ -199,7 +201,7 @@ def triangle(grid: Grid, step: int = 1, symmetric: bool = True) -> Grid:
     return [[p for p in triangle_row(row, idx)] for idx, row in enumerate(grid)]
 
 
-def sparsify(grid: Grid, percentage: float) -> Grid:
+def sparsify(grid: Grid, percentage: float, rng: Random = None) -> Grid:
     """Drop a certain percentage of points randomly
     This function keeps exactly the given percentage
     for a faster, approximate method use fast_sparsify
@@ -207,37 +209,166 @@ def sparsify(grid: Grid, percentage: float) -> Grid:
     Args:
         grid (Grid): Grid to drop points from
         percentage (float): Percentage of points to keep
+        rng (Random, optional): Random number generator, for repeatable results. Defaults to None.
 
     Returns:
         Grid: Transformed grid
     """
-    # Determine which points to keep
-    row_size = len(grid[0])
-    point_indexes = [
-        col_index + (row_index * row_size) for row_index, row in enumerate(grid) for col_index, _ in enumerate(row)
-    ]
-    keep = round(len(point_indexes) * percentage)
-    shuffle(point_indexes)
-    points_to_keep = point_indexes[:keep]
+    rng = rng or random
 
-    return [
-        [p for col_index, p in enumerate(row) if (col_index + (row_index * row_size)) in points_to_keep]
-        for row_index, row in enumerate(grid)
-    ]
+    # Determine which points to keep, numbering points across all rows so ragged grids work
+    total = sum(len(row) for row in grid)
+    points_to_keep = set(rng.sample(range(total), round(total * percentage)))
 
+    result = []
+    start = 0
+    for row in grid:
+        result.append([p for col_index, p in enumerate(row) if (start + col_index) in points_to_keep])
+        start += len(row)
+    return result
 
-def fast_sparsify(grid: Grid, percentage: float) -> Grid:
+
+def fast_sparsify(grid: Grid, percentage: float, rng: Random = None) -> Grid:
     """Drop an approximate percentage of points randomly
     This function randomly evaluates each point - for an exact percentage, use sparsify
 
     Args:
         grid (Grid): Grid to drop points from
         percentage (float): Percentage chance of keeping each point
+        rng (Random, optional): Random number generator, for repeatable results. Defaults to None.
 
     Returns:
         Grid: Transformed grid
     """
-    return [[p for p in row if random() < percentage] for row in grid]
+    rand = (rng or random).random
+    return [[p for p in row if rand() < percentage] for row in grid]
+
+
+def poisson_disc(
+    size: int,
+    radius: float,
+    k: int = 30,
+    density: Image = None,
+    min_radius: float = None,
+    wrap: bool = False,
+    rng: Random = None,
+) -> Grid:
+    """Build a grid of randomly placed points, where no two points are closer than a given radius
+    This gives a natural looking 'blue noise' layout - see Bridson's Poisson-disc sampling
+
+    If a density image is given, the radius varies across the grid
+    Black areas of the image use min_radius (densest), and white areas use radius (sparsest)
+
+    Points are placed on whole pixels within the grid, and spacing is checked after rounding, so it always holds
+    The result is split into rows of points (sorted left to right) with a height of radius,
+    so it can be used with the other grid functions
+
+    Points are added one at a time, so the cost grows with the number of points (roughly size^2 / radius^2)
+    A 256 grid with a radius of 12 takes around 50ms, but a 4096 grid with a radius of 6 (around 300k points)
+    takes around 45 seconds
+
+    Args:
+        size (int): Size (width or height) of the grid
+        radius (float): Minimum distance between points, or the maximum if a density image is given
+        k (int, optional): Number of candidates to try around each point. Defaults to 30.
+        density (Image, optional): Image controlling the radius across the grid. Defaults to None.
+        min_radius (float, optional): Radius in the densest areas. Defaults to half of radius.
+        wrap (bool, optional): Whether distances wrap around the edges, for seamless tiling. Defaults to False.
+        rng (Random, optional): Random number generator, for repeatable results. Defaults to None.
+
+    Returns:
+        Grid: Poisson-disc distributed points
+    """
+    gen = np.random.default_rng((rng or random).getrandbits(64))
+    if density is None:
+        min_radius = radius
+    elif min_radius is None:
+        min_radius = radius / 2
+
+    def radius_at(pts: np.ndarray) -> np.ndarray:
+        if density is None:
+            return np.full(len(pts), float(radius))
+        xy = np.clip(pts.astype(np.intp), 0, size - 1)
+        return min_radius + (radius - min_radius) * density_map[xy[:, 1], xy[:, 0]]
+
+    if density is not None:
+        density_map = np.asarray(density.convert("L").resize((size, size)), dtype=np.float64) / 255
+
+    # Background grid, with each cell small enough to hold at most one point
+    # When wrapping, cells must evenly divide the grid so neighbours line up across the edges
+    # Otherwise, the grid is padded with empty cells so neighbour lookups never go out of bounds
+    cells = math.ceil(size / (min_radius / math.sqrt(2)))
+    cell = size / cells
+    span = math.ceil(radius / cell)
+    pad = 0 if wrap else span
+    background = np.full((cells + 2 * pad, cells + 2 * pad), -1, dtype=np.intp)
+    reach = np.arange(-span, span + 1)
+
+    points = np.zeros((1024, 2))
+    radii = np.zeros(1024)
+    n = 0
+
+    def add_point(p: np.ndarray, r: float):
+        nonlocal points, radii, n
+        if n >= len(points):
+            points = np.concatenate([points, np.zeros_like(points)])
+            radii = np.concatenate([radii, np.zeros_like(radii)])
+        points[n] = p
+        radii[n] = r
+        background[pad + min(int(p[1] // cell), cells - 1), pad + min(int(p[0] // cell), cells - 1)] = n
+        active.append(n)
+        n += 1
+
+    active = []
+    first = gen.integers(size, size=(1, 2)).astype(np.float64)
+    add_point(first[0], radius_at(first)[0])
+
+    while active:
+        a = int(gen.integers(len(active)))
+        p = points[active[a]]
+
+        # Candidates are spread evenly over the annulus between r and 2r of the active point
+        ang = gen.random(k) * (2 * math.pi)
+        dist = radii[active[a]] * np.sqrt(1 + 3 * gen.random(k))
+        # Candidates are rounded before checking, so the spacing holds for the final pixel positions
+        candidates = np.rint(p + np.stack([np.cos(ang), np.sin(ang)], axis=1) * dist[:, None])
+        if wrap:
+            candidates %= size
+        else:
+            candidates = candidates[((candidates >= 0) & (candidates <= size - 1)).all(axis=1)]
+        cand_radii = radius_at(candidates)
+
+        # Look up every nearby point for every candidate at once
+        cx = np.minimum((candidates[:, 0] // cell).astype(np.intp), cells - 1)[:, None] + reach + pad
+        cy = np.minimum((candidates[:, 1] // cell).astype(np.intp), cells - 1)[:, None] + reach + pad
+        if wrap:
+            cx %= cells
+            cy %= cells
+        neighbours = background[cy[:, :, None], cx[:, None, :]]
+
+        delta = points[neighbours] - candidates[:, None, None, :]
+        if wrap:
+            delta = np.abs(delta)
+            delta = np.minimum(delta, size - delta)
+        limit = np.maximum(cand_radii[:, None, None], radii[neighbours]) if density is not None else radius
+        valid = ((neighbours < 0) | ((delta ** 2).sum(axis=-1) >= limit ** 2)).all(axis=(1, 2))
+
+        if valid.any():
+            c = np.argmax(valid)
+            add_point(candidates[c], cand_radii[c])
+        else:
+            # Nothing fits around this point, so it's done
+            active[a] = active[-1]
+            active.pop()
+
+    # Split points into rows, for compatibility with the other grid functions
+    coords = points[:n].astype(np.int64)
+    bands = (coords[:, 1] // radius).astype(np.int64)
+    order = np.lexsort((coords[:, 0], bands))
+    rows = {}
+    for band, (xx, yy) in zip(bands[order].tolist(), coords[order].tolist()):
+        rows.setdefault(band, []).append((xx, yy))
+    return [rows[band] for band in sorted(rows)]
 
 
 def flatten(grid: Grid) -> list[Point]:
@@ -278,6 +409,524 @@ def apply(grid: Grid, func: Callable[[Point], Point]) -> Grid:
     return [[func(p) for p in row] for row in grid]
 
 
+class ArrayGrid:
+    """A grid stored as a single array of points, for working with very dense grids
+
+    Points are stored row after row in an (N, 2) array, with offsets marking where each row starts
+    This means ragged grids (eg. radial or triangular grids) work the same as square grids
+    All operations are vectorized and return a new grid - use from_list and to_list to convert to and from a Grid
+    """
+
+    def __init__(self, points: np.ndarray, offsets: np.ndarray):
+        """Create a grid from an array of points
+
+        Args:
+            points (np.ndarray): (N, 2) array of (x, y) coordinates, row after row
+            offsets (np.ndarray): Index of the first point of each row, followed by N
+        """
+        self.points = np.asarray(points).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.intp)
+
+    @classmethod
+    def from_list(cls, grid: Grid) -> "ArrayGrid":
+        """Convert a grid of lists into an ArrayGrid
+
+        Args:
+            grid (Grid): Grid to convert
+
+        Returns:
+            ArrayGrid: Converted grid
+        """
+        offsets = np.concatenate([[0], np.cumsum([len(row) for row in grid])])
+        return cls(np.array(flatten(grid)).reshape(-1, 2), offsets)
+
+    @classmethod
+    def build(cls, size: int, num: int) -> "ArrayGrid":
+        """Build a basic square grid - see build
+
+        Args:
+            size (int): Size (width or height) of the grid
+            num (int): Number of points in each row and column
+
+        Returns:
+            ArrayGrid: Simple grid with equally spaced points
+        """
+        coords = np.rint((size / (num - 1)) * np.arange(num)).astype(np.int64)
+        xx, yy = np.meshgrid(coords, coords)
+        return cls(np.stack([xx.ravel(), yy.ravel()], axis=1), np.arange(num + 1) * num)
+
+    @classmethod
+    def build_radial(
+        cls, size: int, num_angular: int, num_radius: int, offset: int = 0, center: bool = True
+    ) -> "ArrayGrid":
+        """Build a radial grid - see build_radial
+
+        Args:
+            size (int): Size (width or height) of the grid
+            num_angular (int): Number of points in each 'circle'
+            num_radius (int): Number of 'circles'
+            offset (int, optional): Angular offset, in degrees. Defaults to 0.
+            center (bool, optional): Add an extra point at the center of the radial grid?. Defaults to True.
+
+        Returns:
+            ArrayGrid: Radial grid with equally spaced points
+        """
+        rad = ((size // 2) / num_radius) * (np.arange(num_radius) + 1)
+        ang = math.radians(offset) + ((2 * math.pi) / num_angular) * np.arange(num_angular)
+        xx = size // 2 + np.rint(rad[:, None] * np.cos(ang)[None, :]).astype(np.int64)
+        yy = size // 2 + np.rint(rad[:, None] * np.sin(ang)[None, :]).astype(np.int64)
+        points = np.stack([xx.ravel(), yy.ravel()], axis=1)
+        offsets = np.arange(num_radius + 1) * num_angular
+
+        if center:
+            points = np.concatenate([[(size // 2, size // 2)], points])
+            offsets = np.concatenate([[0], offsets + 1])
+        return cls(points, offsets)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    @property
+    def num_rows(self) -> int:
+        """Number of rows in the grid"""
+        return len(self.offsets) - 1
+
+    @property
+    def row_lengths(self) -> np.ndarray:
+        """Number of points in each row"""
+        return np.diff(self.offsets)
+
+    @property
+    def row_indexes(self) -> np.ndarray:
+        """Row that each point belongs to"""
+        return np.repeat(np.arange(self.num_rows), self.row_lengths)
+
+    @property
+    def column_indexes(self) -> np.ndarray:
+        """Position of each point within its row"""
+        return np.arange(len(self.points)) - np.repeat(self.offsets[:-1], self.row_lengths)
+
+    def row(self, index: int) -> np.ndarray:
+        """Get the points of a single row
+
+        Args:
+            index (int): Row index
+
+        Returns:
+            np.ndarray: (n, 2) array of points in the row
+        """
+        return self.points[self.offsets[index]:self.offsets[index + 1]]
+
+    def to_list(self) -> Grid:
+        """Convert this grid back into a grid of lists
+
+        Returns:
+            Grid: Converted grid
+        """
+        points = [tuple(p) for p in self.points.tolist()]
+        return [points[start:end] for start, end in zip(self.offsets[:-1], self.offsets[1:])]
+
+    def flatten(self) -> np.ndarray:
+        """Flatten the grid into a single array of points - see flatten
+
+        Returns:
+            np.ndarray: (N, 2) array of (x, y) coordinates
+        """
+        return self.points.copy()
+
+    def select(self, mask: np.ndarray) -> "ArrayGrid":
+        """Keep only some points of the grid, keeping the row structure
+
+        Args:
+            mask (np.ndarray): Boolean array, True for each point to keep
+
+        Returns:
+            ArrayGrid: Grid with only the selected points
+        """
+        counts = np.bincount(self.row_indexes[mask], minlength=self.num_rows)
+        return ArrayGrid(self.points[mask], np.concatenate([[0], np.cumsum(counts)]))
+
+    def jitter(
+        self,
+        min_variance: int = None,
+        max_variance: int = None,
+        size: int = None,
+        clamp: bool = False,
+        variance_list: list[int] = None,
+        rng: np.random.Generator = None,
+    ) -> "ArrayGrid":
+        """Randomly jitter all points in the grid - see jitter
+        If both min_variance and max_variance are given, points are jittered from -max to -min or min to max
+
+        Args:
+            min_variance (int, optional): Minimum jitter amount. Defaults to None.
+            max_variance (int, optional): Maximum jitter amount. Defaults to None.
+            size (int, optional): Grid size - useful for clamping. Defaults to the largest coordinate.
+            clamp (bool, optional): Whether to stop points leaving the bounds. Defaults to False.
+            variance_list (list[int], optional): List of possible jitter amounts. Defaults to None.
+            rng (np.random.Generator, optional): Random number generator. Defaults to None.
+
+        Returns:
+            ArrayGrid: Transformed grid, with each point 'jittered'
+        """
+        rng = rng or np.random.default_rng()
+        shape = self.points.shape
+        if size is None:
+            size = self.points.max(initial=0)
+
+        if variance_list is not None and len(variance_list) > 0:
+            offsets = rng.choice(variance_list, shape)
+        elif min_variance is None and max_variance is None:
+            offsets = np.zeros(shape, dtype=np.int64)
+        else:
+            if min_variance is None or max_variance is None:
+                low, high = 0, max_variance if min_variance is None else min_variance
+            else:
+                low, high = min_variance, max(min_variance + 1, max_variance)
+            offsets = rng.choice([-1, 1], shape) * rng.integers(low, high, shape)
+
+        points = self.points + offsets
+        if clamp:
+            points = np.clip(points, 0, size)
+        return ArrayGrid(points, self.offsets)
+
+    def shift_rows(self, offset: int, mod: int = 2, size: int = None, clamp: bool = False) -> "ArrayGrid":
+        """Shift Nth rows of the grid by a fixed amount - see shift_rows
+
+        Args:
+            offset (int): How much to shift each row by
+            mod (int, optional): Shift every X rows. Defaults to 2.
+            size (int, optional): Size of the grid - used if clamping is enabled. Defaults to None.
+            clamp (bool, optional): Whether to remove points outside the bounds. Defaults to False.
+
+        Returns:
+            ArrayGrid: Transformed grid, with shifted rows
+        """
+        shifted = self.row_indexes % mod == 0
+        points = self.points.copy()
+        points[shifted, 0] += offset
+        result = ArrayGrid(points, self.offsets)
+        if clamp:
+            return result.select((points[:, 0] >= 0) & (points[:, 0] <= size))
+        return result
+
+    def shift_columns(self, offset: int, mod: int = 2, size: int = None, clamp: bool = False) -> "ArrayGrid":
+        """Shift Nth columns of the grid by a fixed amount - see shift_columns
+
+        Args:
+            offset (int): How much to shift each column by
+            mod (int, optional): Shift every X columns. Defaults to 2.
+            size (int, optional): Size of the grid - used if clamping is enabled. Defaults to None.
+            clamp (bool, optional): Whether to remove points outside the bounds. Defaults to False.
+
+        Returns:
+            ArrayGrid: Transformed grid, with shifted columns
+        """
+        shifted = self.column_indexes % mod == 0
+        points = self.points.copy()
+        points[shifted, 1] += offset
+        result = ArrayGrid(points, self.offsets)
+        if clamp:
+            return result.select((points[:, 1] >= 0) & (points[:, 1] <= size))
+        return result
+
+    def triangle(self, step: int = 1, symmetric: bool = True) -> "ArrayGrid":
+        """Turn a rectangular grid into a triangular grid - see triangle
+
+        Args:
+            step (int, optional): How many points to remove from each 'level'. Defaults to 1.
+            symmetric (bool, optional): Should points be removed from both sides of the row?. Defaults to True.
+
+        Returns:
+            ArrayGrid: Transformed grid
+        """
+        cut = self.row_indexes * step
+        columns = self.column_indexes
+        mask = columns >= cut
+        if symmetric:
+            mask &= columns < np.repeat(self.row_lengths, self.row_lengths) - cut
+        return self.select(mask)
+
+    def sparsify(self, percentage: float, rng: np.random.Generator = None) -> "ArrayGrid":
+        """Drop a certain percentage of points randomly, keeping exactly the given percentage - see sparsify
+
+        Args:
+            percentage (float): Percentage of points to keep
+            rng (np.random.Generator, optional): Random number generator. Defaults to None.
+
+        Returns:
+            ArrayGrid: Transformed grid
+        """
+        rng = rng or np.random.default_rng()
+        mask = np.zeros(len(self.points), dtype=bool)
+        mask[rng.choice(len(self.points), round(len(self.points) * percentage), replace=False)] = True
+        return self.select(mask)
+
+    def fast_sparsify(self, percentage: float, rng: np.random.Generator = None) -> "ArrayGrid":
+        """Drop an approximate percentage of points randomly - see fast_sparsify
+
+        Args:
+            percentage (float): Percentage chance of keeping each point
+            rng (np.random.Generator, optional): Random number generator. Defaults to None.
+
+        Returns:
+            ArrayGrid: Transformed grid
+        """
+        rng = rng or np.random.default_rng()
+        return self.select(rng.random(len(self.points)) < percentage)
+
+    def transpose(self) -> "ArrayGrid":
+        """Transpose (swap rows and columns) the grid - see transpose
+        As with transpose, ragged grids are cut down to the length of the shortest row
+
+        Returns:
+            ArrayGrid: Transposed grid
+        """
+        width = self.row_lengths.min() if self.num_rows > 0 else 0
+        index = self.offsets[:-1, None] + np.arange(width)[None, :]
+        points = self.points[index.T.ravel()][:, ::-1]
+        return ArrayGrid(points, np.arange(width + 1) * self.num_rows)
+
+    def apply(self, func: Callable[[np.ndarray], np.ndarray]) -> "ArrayGrid":
+        """Apply a vectorized function to all points of the grid
+
+        Args:
+            func (Callable[[np.ndarray], np.ndarray]): Transformation function, taking and returning an (N, 2) array
+
+        Returns:
+            ArrayGrid: Transformed grid
+        """
+        return ArrayGrid(func(self.points), self.offsets)
+
+
+class PointIndex:
+    """A uniform-grid spatial index over a set of points, for fast radius and nearest-neighbour queries
+
+    Points are bucketed into square cells (sorted by cell, so the index is just a few flat arrays)
+    Queries only look at the cells around each query point, and are vectorized over batches of queries
+    If a wrap size is given, distances wrap around the edges like a torus - see poisson_disc
+    """
+
+    # Queries are handled in chunks of at most this many points, and at most this many (query, point) candidate pairs
+    # Limiting candidates bounds memory even when points are clustered, and one cell holds a large share of them
+    QUERY_CHUNK = 4096
+    CANDIDATE_CHUNK = 1 << 20
+
+    def __init__(
+        self,
+        points: Union[np.ndarray, list[Point], "ArrayGrid"],
+        cell_size: float = None,
+        wrap: Union[int, tuple[int, int]] = None,
+    ):
+        """Build an index over some points
+
+        Args:
+            points (np.ndarray | list[Point] | ArrayGrid): Points to index, eg. from flatten or an ArrayGrid
+            cell_size (float, optional): Size of each cell. Defaults to roughly two points per cell.
+            wrap (int | tuple[int, int], optional): Width and height to wrap distances around. Defaults to None.
+        """
+        if isinstance(points, ArrayGrid):
+            points = points.points
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.wrap = None if wrap is None else np.broadcast_to(np.asarray(wrap, dtype=np.float64), (2,))
+
+        if self.wrap is not None:
+            self.origin = np.zeros(2)
+            extent = self.wrap
+        elif len(self.points) > 0:
+            self.origin = self.points.min(axis=0)
+            extent = self.points.max(axis=0) - self.origin
+        else:
+            self.origin = np.zeros(2)
+            extent = np.zeros(2)
+
+        if cell_size is None:
+            cell_size = math.sqrt(2 * max(extent[0], 1) * max(extent[1], 1) / max(len(self.points), 1))
+
+        # When wrapping, cells must evenly divide the area so neighbours line up across the edges
+        if self.wrap is not None:
+            self.shape = np.maximum(np.rint(extent / cell_size), 1).astype(np.intp)
+            self.cell = extent / self.shape
+        else:
+            self.shape = (np.floor(extent / cell_size) + 1).astype(np.intp)
+            self.cell = np.full(2, float(cell_size))
+
+        cells = self._cell_ids(*self._cell_coords(self.points))
+        self.order = np.argsort(cells, kind="stable")
+        self.starts = np.searchsorted(cells[self.order], np.arange(self.shape[0] * self.shape[1] + 1))
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _cell_coords(self, points: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        coords = np.floor((points - self.origin) / self.cell).astype(np.intp)
+        if self.wrap is not None:
+            coords %= self.shape
+        else:
+            # Clamping points outside the index only moves them closer to the indexed points
+            coords = np.clip(coords, 0, self.shape - 1)
+        return coords[:, 0], coords[:, 1]
+
+    def _cell_ids(self, cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+        return cy * self.shape[0] + cx
+
+    def _delta(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        delta = np.abs(a - b)
+        if self.wrap is not None:
+            delta %= self.wrap
+            delta = np.minimum(delta, self.wrap - delta)
+        return delta
+
+    def _cells(self, queries: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray, bool]:
+        """Find the cells covering a radius around each query
+
+        Returns (Q, C) arrays of where each cell starts in the sorted points and how many points it holds,
+        plus whether every cell was searched (in which case any radius is covered)
+        """
+        span = np.ceil(radius / self.cell).astype(np.intp)
+        full = 2 * span + 1 >= self.shape
+        cx, cy = self._cell_coords(queries)
+
+        def axis_cells(c, axis):
+            if full[axis]:
+                cells = np.broadcast_to(np.arange(self.shape[axis]), (len(c), self.shape[axis]))
+                return cells, np.ones(cells.shape, dtype=bool)
+            cells = c[:, None] + np.arange(-span[axis], span[axis] + 1)
+            if self.wrap is not None:
+                return cells % self.shape[axis], np.ones(cells.shape, dtype=bool)
+            return np.clip(cells, 0, self.shape[axis] - 1), (cells >= 0) & (cells < self.shape[axis])
+
+        xs, x_valid = axis_cells(cx, 0)
+        ys, y_valid = axis_cells(cy, 1)
+        ids = self._cell_ids(xs[:, None, :], ys[:, :, None]).reshape(len(queries), -1)
+        valid = (y_valid[:, :, None] & x_valid[:, None, :]).reshape(len(queries), -1)
+        starts = self.starts[ids]
+        return starts, np.where(valid, self.starts[ids + 1] - starts, 0), bool(full.all())
+
+    def _candidates(
+        self, queries: np.ndarray, radius: float
+    ) -> Iterator[tuple[int, int, np.ndarray, np.ndarray, np.ndarray, bool]]:
+        """Find every point in the cells covering a radius around each query, in chunks of bounded size
+
+        Yields (first query, number of queries) for each chunk, then (query indexes within the chunk, point indexes,
+        squared distances) for each candidate pair, plus whether every cell was searched - see _cells
+        A single query is never split, so a chunk only goes over CANDIDATE_CHUNK pairs if one query alone does
+        """
+        for block_start in range(0, len(queries), self.QUERY_CHUNK):
+            block = queries[block_start:block_start + self.QUERY_CHUNK]
+            block_starts, block_counts, full = self._cells(block, radius)
+            cumulative = np.concatenate([[0], np.cumsum(block_counts.sum(axis=1))])
+
+            first = 0
+            while first < len(block):
+                last = int(np.searchsorted(cumulative, cumulative[first] + self.CANDIDATE_CHUNK, side="right")) - 1
+                last = max(last, first + 1)
+                chunk = block[first:last]
+                counts = block_counts[first:last].ravel()
+                starts = block_starts[first:last].ravel()
+
+                # Expand each (query, cell) pair into one entry per point in that cell
+                query_index = np.repeat(np.repeat(np.arange(len(chunk)), block_counts.shape[1]), counts)
+                position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                point_index = self.order[np.repeat(starts, counts) + position]
+
+                delta = self._delta(self.points[point_index], chunk[query_index])
+                yield block_start + first, len(chunk), query_index, point_index, (delta ** 2).sum(axis=1), full
+                first = last
+
+    def query_radius(self, queries: Union[Point, np.ndarray], radius: float) -> list[np.ndarray]:
+        """Find all points within a radius of each query point
+
+        Args:
+            queries (Point | np.ndarray): Query point, or (Q, 2) array of query points
+            radius (float): Search radius
+
+        Returns:
+            list[np.ndarray]: Indexes of the points within the radius of each query, sorted by distance
+                For a single query point, just the array of indexes is returned
+        """
+        single = np.ndim(queries) == 1
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 2)
+
+        results = []
+        for _, n, query_index, point_index, distance, _ in self._candidates(queries, radius):
+            inside = distance <= radius ** 2
+            query_index, point_index, distance = query_index[inside], point_index[inside], distance[inside]
+
+            order = np.lexsort((point_index, distance, query_index))
+            bounds = np.searchsorted(query_index[order], np.arange(1, n))
+            results.extend(np.split(point_index[order], bounds))
+        return results[0] if single else results
+
+    def count_radius(self, queries: Union[Point, np.ndarray], radius: float) -> np.ndarray:
+        """Count the points within a radius of each query point, eg. for collision checks
+
+        Args:
+            queries (Point | np.ndarray): Query point, or (Q, 2) array of query points
+            radius (float): Search radius
+
+        Returns:
+            np.ndarray: Number of points within the radius of each query
+        """
+        single = np.ndim(queries) == 1
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 2)
+
+        counts = np.zeros(len(queries), dtype=np.intp)
+        for start, n, query_index, _, distance, _ in self._candidates(queries, radius):
+            counts[start:start + n] = np.bincount(query_index[distance <= radius ** 2], minlength=n)
+        return counts[0] if single else counts
+
+    def query_nearest(self, queries: Union[Point, np.ndarray], k: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """Find the k nearest points to each query point
+
+        Args:
+            queries (Point | np.ndarray): Query point, or (Q, 2) array of query points
+            k (int, optional): Number of neighbours to find. Defaults to 1.
+
+        Raises:
+            ValueError: If there are fewer than k points in the index
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (distances, indexes) of the nearest points, nearest first
+                Both are (Q, k) arrays, or (k,) arrays for a single query point
+        """
+        if k > len(self.points):
+            raise ValueError("Not enough points in the index to find k neighbours")
+
+        single = np.ndim(queries) == 1
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 2)
+        distances = np.empty((len(queries), k))
+        indexes = np.empty((len(queries), k), dtype=np.intp)
+
+        # Search a growing radius around each query, until it contains at least k points
+        # Only points within the searched radius are guaranteed to be the nearest
+        remaining = np.arange(len(queries))
+        radius = self.cell.max() * max(1, math.sqrt(k / 2))
+        while len(remaining) > 0:
+            for start, n, query_index, point_index, distance, full in self._candidates(queries[remaining], radius):
+                chunk = remaining[start:start + n]
+                if not full:
+                    inside = distance <= radius ** 2
+                    query_index, point_index, distance = query_index[inside], point_index[inside], distance[inside]
+
+                order = np.lexsort((point_index, distance, query_index))
+                query_index, point_index, distance = query_index[order], point_index[order], distance[order]
+                group_starts = np.searchsorted(query_index, np.arange(len(chunk)))
+                found = np.bincount(query_index, minlength=len(chunk)) >= k
+
+                take = group_starts[found, None] + np.arange(k)
+                distances[chunk[found]] = np.sqrt(distance[take])
+                indexes[chunk[found]] = point_index[take]
+                remaining[start:start + len(chunk)][found] = -1
+
+            remaining = remaining[remaining >= 0]
+            radius *= 2
+
+        if single:
+            return distances[0], indexes[0]
+        return distances, indexes
+
+
 def visualise(grid: Grid, size: int, padding: int):
     """Helper function to visualise a grid
 
@@ -1,17 +1,25 @@
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from os import listdir, path
-from PIL import Image
+from PIL import Image, ImageChops
 from pathlib import Path
+from typing import Iterable, Iterator, Union
+import numpy as np
 
+# File extensions recognised as images when loading from a directory
+IMAGE_EXTENSIONS = {".bmp", ".gif", ".jpeg", ".jpg", ".png", ".tga", ".tif", ".tiff", ".webp"}
 
-def images_from_path(filepath: str, input_root: str = "input") -> list[str]:
-    """Get a list of image paths from a given location
+
+def iter_image_paths(filepath: str, input_root: str = "input") -> Iterator[str]:
+    """Lazily find image paths from a given location
+    Directories are searched in sorted order, and only files with a recognised image extension are included
 
     Args:
-        filepath (str): Filepath to load image(s) from
+        filepath (str): Filepath to find image(s) from
         input_root (str, optional): Extra directory to check, if path cannot be found. Defaults to "input".
 
-    Returns:
-        list[str]: Paths to all images found from the given path
+    Yields:
+        str: Path to each image found from the given path
     """
     # If the path doesn't exist, check with the input_root added
     # eg. if cat.png doesn't exist, we'll check input/cat.png
@@ -20,21 +28,96 @@ def images_from_path(filepath: str, input_root: str = "input") -> list[str]:
         if path.exists(path_with_root):
             filepath = path_with_root
         else:
-            return []
+            return
 
     if path.isfile(filepath):
-        return [filepath]
+        yield filepath
     elif path.isdir(filepath):
-        return [
-            fp for f in listdir(filepath) if path.isfile(fp := path.join(filepath, f))
-        ]
+        for f in sorted(listdir(filepath)):
+            if path.splitext(f)[1].lower() in IMAGE_EXTENSIONS and path.isfile(fp := path.join(filepath, f)):
+                yield fp
+
+
+def images_from_path(filepath: str, input_root: str = "input") -> list[str]:
+    """Get a list of image paths from a given location
+    See iter_image_paths for a lazy version
+
+    Args:
+        filepath (str): Filepath to load image(s) from
+        input_root (str, optional): Extra directory to check, if path cannot be found. Defaults to "input".
+
+    Returns:
+        list[str]: Paths to all images found from the given path
+    """
+    return list(iter_image_paths(filepath, input_root))
+
+
+def load_image(filepath: str) -> Image:
+    """Load a single image, converted to RGBA mode
+    The file is closed once the image has been read
+
+    Args:
+        filepath (str): Path to the image
+
+    Returns:
+        Image: Loaded image
+    """
+    with Image.open(filepath) as im:
+        return im.convert("RGBA")
+
+
+def iter_from_path(filepath: str, input_root: str = "input", prefetch: int = 0) -> Iterator[tuple[str, Image]]:
+    """Lazily load (filename, Image) tuples for a given path
+    Only a handful of images are held in memory at a time, so this can stream through very large directories
+    Filenames will be returned without path data or extension
+    All images will be converted to RGBA mode
+
+    Args:
+        filepath (str): Filepath to load image(s) from
+        input_root (str, optional): Extra directory to check, if path cannot be found. Defaults to "input".
+        prefetch (int, optional): Number of images to load ahead on background threads. Defaults to 0.
+
+    Yields:
+        tuple[str, Image]: Filename and image, in sorted order
+    """
+    paths = iter_image_paths(filepath, input_root)
+    if prefetch < 1:
+        for f in paths:
+            yield (Path(f).stem, load_image(f))
+        return
+
+    with ThreadPoolExecutor(prefetch) as pool:
+        queue = deque()
+        for f in paths:
+            queue.append((Path(f).stem, pool.submit(load_image, f)))
+            if len(queue) > prefetch:
+                name, future = queue.popleft()
+                yield (name, future.result())
+
+        while queue:
+            name, future = queue.popleft()
+            yield (name, future.result())
+
+
+def iter_images_from_path(filepath: str, input_root: str = "input", prefetch: int = 0) -> Iterator[Image]:
+    """Same as the above function, but only yields the images
+
+    Args:
+        filepath (str): Filepath to load image(s) from
+        input_root (str, optional): Extra directory to check, if path cannot be found. Defaults to "input".
+        prefetch (int, optional): Number of images to load ahead on background threads. Defaults to 0.
 
-    return []
+    Yields:
+        Image: Each image loaded from the given path
+    """
+    for _, image in iter_from_path(filepath, input_root, prefetch):
+        yield image
 
 
 def load_images_from_path(filepath: str, input_root: str = "input") -> list[Image]:
-    """Same as the above function, but opens images up with PIL
+    """Same as images_from_path, but opens images up with PIL
     All images will be converted to RGBA mode
+    See iter_images_from_path for a lazy version
 
     Args:
         filepath (str): Filepath to load image(s) from
@@ -43,15 +126,14 @@ def load_images_from_path(filepath: str, input_root: str = "input") -> list[Imag
     Returns:
         list[Image]: All images loaded from the given path
     """
-    return [
-        Image.open(f).convert("RGBA") for f in images_from_path(filepath, input_root)
-    ]
+    return list(iter_images_from_path(filepath, input_root))
 
 
 def load_from_path(filepath: str, input_root: str = "input") -> list[tuple[str, Image]]:
     """Returns a list of (filename, Image) tuples for a given path
     Filenames will be returned without path data or extension
     All images will be converted to RGBA mode
+    See iter_from_path for a lazy version
 
     Args:
         filepath (str): Filepath to load image(s) from
@@ -60,10 +142,24 @@ def load_from_path(filepath: str, input_root: str = "input") -> list[tuple[str,
     Returns:
         list[Image]: All images loaded from the given path
     """
-    return [
-        (Path(f).stem, Image.open(f).convert("RGBA"))
-        for f in images_from_path(filepath, input_root)
-    ]
+    return list(iter_from_path(filepath, input_root))
+
+
+def roll(im: Image, dx: int, dy: int) -> Image:
+    """Offset an image by a given amount, wrapping across the edges
+    eg. roll(im, 10, 0) moves everything 10 pixels right, with the rightmost 10 columns moving to the left edge
+
+    This is useful for working on tiling textures
+
+    Args:
+        im (Image): Image to offset
+        dx (int): Horizontal offset, positive moves right
+        dy (int): Vertical offset, positive moves down
+
+    Returns:
+        Image: Offset copy of the image
+    """
+    return ImageChops.offset(im, dx % max(im.width, 1), dy % max(im.height, 1))
 
 
 def swap_quadrants(im: Image) -> Image:
@@ -71,6 +167,7 @@ def swap_quadrants(im: Image) -> Image:
     eg. top left -> bottom right
 
     This is useful for working on tiling textures
+    The image is updated in place - for a copy, use roll(im, -(im.width // 2), -(im.height // 2))
 
     Args:
         image (Image): Image to swap
@@ -78,22 +175,18 @@ def swap_quadrants(im: Image) -> Image:
     Returns:
         Image: Image with all four quadrants swapped
     """
-    x_mid = im.width // 2
-    y_mid = im.height // 2
-    quad_top_left = im.crop((0, 0, x_mid, y_mid))
-    quad_top_right = im.crop((x_mid, 0, im.width, y_mid))
-    quad_bottom_left = im.crop((0, y_mid, x_mid, im.height))
-    quad_bottom_right = im.crop((x_mid, y_mid, im.width, im.height))
-
-    im.paste(quad_top_left, (x_mid, y_mid))
-    im.paste(quad_top_right, (0, y_mid))
-    im.paste(quad_bottom_left, (0, x_mid))
-    im.paste(quad_bottom_right, (0, 0))
+    im.paste(roll(im, -(im.width // 2), -(im.height // 2)))
     return im
 
 
 def wrapped_alpha_composite(im: Image, paste: Image, coord: tuple[int, int]) -> Image:
     """Alpha composite (paste) an image onto a canvas, wrapping across the edges as required
+    Pastes larger than the canvas are tiled, so they overlap themselves - see wrap_regions
+
+    Each region still goes through Image.alpha_composite, which crops the paste and the canvas region
+    and pastes the result back - so there are two small copies per region (at most four regions per paste)
+    A writable array view of a PIL image isn't available, so this can't be avoided here
+    For drawing many pastes onto one canvas without copies, use SpriteCompositor instead
 
     Args:
         im (Image): Canvas image to paste onto
@@ -103,57 +196,177 @@ def wrapped_alpha_composite(im: Image, paste: Image, coord: tuple[int, int]) ->
     Returns:
         Image: Canvas image with wrapped pasted image
     """
-    corners = (coord[0], coord[1], coord[0] + paste.width, coord[1] + paste.height)
-
-    # Note that alpha_composite is in-place so we can do some recursive trickery without combining results
-    # Check the base case - all of the paste fits inside the image
-    if (
-        corners[0] >= 0
-        and corners[2] <= im.width
-        and corners[1] >= 0
-        and corners[3] <= im.height
-    ):
-        im.alpha_composite(paste, coord)
+    for dx, dy, sx, sy, w, h in wrap_regions(im.size, coord, paste.size):
+        if (sx, sy, w, h) == (0, 0) + paste.size:
+            im.alpha_composite(paste, (dx, dy))
+        else:
+            im.alpha_composite(paste, (dx, dy), (sx, sy, sx + w, sy + h))
+    return im
+
+
+def wrap_regions(
+    canvas_size: tuple[int, int], coord: tuple[int, int], size: tuple[int, int]
+) -> Iterator[tuple[int, int, int, int, int, int]]:
+    """Split a paste into the regions that land on a canvas, wrapping across the edges as required
+    Pastes larger than the canvas are tiled, so they overlap themselves
+
+    Args:
+        canvas_size (tuple[int, int]): Canvas dimensions
+        coord (tuple[int, int]): Top-left coordinate for pasting, which may be outside the canvas
+        size (tuple[int, int]): Dimensions of the image being pasted
+
+    Yields:
+        tuple[int, int, int, int, int, int]: (canvas x, canvas y, paste x, paste y, width, height) of each region
+    """
+
+    def spans(start: int, length: int, canvas: int) -> list[tuple[int, int, int]]:
+        result = []
+        offset = 0
+        while offset < length:
+            dest = (start + offset) % canvas
+            span = min(length - offset, canvas - dest)
+            result.append((dest, offset, span))
+            offset += span
+        return result
+
+    if canvas_size[0] <= 0 or canvas_size[1] <= 0:
         return
+    for dy, sy, h in spans(coord[1], size[1], canvas_size[1]):
+        for dx, sx, w in spans(coord[0], size[0], canvas_size[0]):
+            yield dx, dy, sx, sy, w, h
 
-    # Recursively split the remainder
-    if corners[0] < 0:
-        # We have a bit off to the left
-        offset = abs(corners[0])
-        if offset > paste.width:
-            return
 
-        paste_out = paste.crop((0, 0, offset, paste.height))
-        paste_in = paste.crop((offset, 0, paste.width, paste.height))
-        wrapped_alpha_composite(im, paste_out, (im.width - offset, coord[1]))
-        wrapped_alpha_composite(im, paste_in, (0, coord[1]))
-    elif corners[2] > im.width:
-        # We have a bit off to the right
-        offset = corners[2] - im.width
-        if offset > paste.width:
-            return
+def alpha_composite_into(dst: np.ndarray, src: np.ndarray):
+    """Alpha composite one RGBA array over another, in place
+    This gives exactly the same result as Image.alpha_composite, but works on array views without copying
 
-        paste_out = paste.crop((paste.width - offset, 0, paste.width, paste.height))
-        paste_in = paste.crop((0, 0, paste.width - offset, paste.height))
-        wrapped_alpha_composite(im, paste_out, (0, coord[1]))
-        wrapped_alpha_composite(im, paste_in, (corners[0], coord[1]))
-    elif corners[1] < 0:
-        # We have a bit off the top
-        offset = abs(corners[1])
-        if offset > paste.height:
-            return
+    Args:
+        dst (np.ndarray): Background RGBA pixels (uint8), updated in place
+        src (np.ndarray): Foreground RGBA pixels (uint8), the same shape as dst
+    """
+    src_a = src[..., 3].astype(np.uint32)
+    blend = dst[..., 3] * (255 - src_a)
+    out_a = src_a * 255 + blend
 
-        paste_out = paste.crop((0, 0, paste.width, offset))
-        paste_in = paste.crop((0, offset, paste.width, paste.height))
-        wrapped_alpha_composite(im, paste_out, (coord[0], im.height - offset))
-        wrapped_alpha_composite(im, paste_in, (coord[0], 0))
-    elif corners[3] > im.height:
-        # We have a bit off the bottom
-        offset = corners[3] - im.height
-        if offset > paste.height:
-            return
+    # Fixed point blending, matching PIL's ImagingAlphaComposite
+    coef1 = src_a * (255 * 255 * 128) // np.maximum(out_a, 1)
+    coef2 = 255 * 128 - coef1
+    visible = src_a > 0
+    for c in range(3):
+        t = src[..., c] * coef1 + dst[..., c] * coef2 + (0x80 << 7)
+        np.copyto(dst[..., c], (((t >> 8) + t) >> 15).astype(np.uint8), where=visible)
+    t = out_a + 0x80
+    np.copyto(dst[..., 3], (((t >> 8) + t) >> 8).astype(np.uint8), where=visible)
+
+
+class SpriteCompositor:
+    """Composite many sprites onto a canvas, wrapping across the edges for seamless tiles
+
+    Resized and rotated sprites are cached, so each (image, size, angle) is only transformed once
+    The canvas is kept as an array while drawing, and each sprite is composited straight into it
+    """
+
+    def __init__(self, canvas: Image, cache_size: int = 256):
+        """Create a compositor for a canvas
+
+        Args:
+            canvas (Image): Canvas to draw onto. This is copied - use image() to get the result.
+            cache_size (int, optional): Maximum number of transformed sprites to keep. Defaults to 256.
+        """
+        self.canvas = np.array(canvas.convert("RGBA"))
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._sprites: OrderedDict[tuple, tuple[Image, np.ndarray]] = OrderedDict()
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return (self.canvas.shape[1], self.canvas.shape[0])
+
+    def reset(self, canvas: Image):
+        """Start drawing on a new canvas, keeping any cached sprites
+
+        Args:
+            canvas (Image): Canvas to draw onto. This is copied - use image() to get the result.
+        """
+        self.canvas = np.array(canvas.convert("RGBA"))
+
+    def sprite(self, image: Image, size: Union[int, tuple[int, int]] = None, angle: float = 0) -> np.ndarray:
+        """Get a resized and rotated copy of an image, from the cache if possible
+        Rotation expands the sprite to fit, using nearest neighbour sampling
+
+        Args:
+            image (Image): Sprite image
+            size (int | tuple[int, int], optional): Size to resize to, before rotating. Defaults to None.
+            angle (float, optional): Rotation in degrees, counter clockwise. Defaults to 0.
+
+        Returns:
+            np.ndarray: Transformed sprite, as RGBA pixels
+        """
+        if isinstance(size, int):
+            size = (size, size)
+        key = (id(image), size, angle)
+
+        # Cached sprites keep a reference to their source image, so ids can't be reused while cached
+        cached = self._sprites.get(key)
+        if cached is not None and cached[0] is image:
+            self.hits += 1
+            self._sprites.move_to_end(key)
+            return cached[1]
+
+        self.misses += 1
+        sprite = image.convert("RGBA")
+        if size is not None and size != sprite.size:
+            sprite = sprite.resize(size)
+        if angle:
+            sprite = sprite.rotate(angle, Image.NEAREST, expand=True)
+
+        pixels = np.asarray(sprite)
+        self._sprites[key] = (image, pixels)
+        self._sprites.move_to_end(key)
+        if len(self._sprites) > self.cache_size:
+            self._sprites.popitem(last=False)
+        return pixels
+
+    def blit(self, sprite: Union[np.ndarray, Image], coord: tuple[int, int]):
+        """Composite a sprite onto the canvas, wrapping across the edges as required
+
+        Args:
+            sprite (np.ndarray | Image): Sprite to draw, as RGBA pixels or an image
+            coord (tuple[int, int]): Top-left coordinate of the sprite
+        """
+        if isinstance(sprite, Image.Image):
+            sprite = np.asarray(sprite.convert("RGBA"))
+
+        h, w = sprite.shape[:2]
+        for dx, dy, sx, sy, rw, rh in wrap_regions(self.size, coord, (w, h)):
+            alpha_composite_into(self.canvas[dy:dy + rh, dx:dx + rw], sprite[sy:sy + rh, sx:sx + rw])
+
+    def draw(self, image: Image, coord: tuple[int, int], size: Union[int, tuple[int, int]] = None, angle: float = 0):
+        """Transform an image (see sprite) and composite it onto the canvas
+
+        Args:
+            image (Image): Sprite image
+            coord (tuple[int, int]): Top-left coordinate of the sprite
+            size (int | tuple[int, int], optional): Size to resize to, before rotating. Defaults to None.
+            angle (float, optional): Rotation in degrees, counter clockwise. Defaults to 0.
+        """
+        self.blit(self.sprite(image, size, angle), coord)
+
+    def draw_many(self, sprites: Iterable[tuple[Image, tuple[int, int], Union[int, tuple[int, int]], float]]):
+        """Draw many sprites in one pass, in order
+
+        Args:
+            sprites (Iterable[tuple[Image, tuple[int, int], int | tuple[int, int], float]]):
+                (image, top-left coordinate, size, angle) for each sprite
+        """
+        for image, coord, size, angle in sprites:
+            self.draw(image, coord, size, angle)
+
+    def image(self) -> Image:
+        """Get the canvas as an image
 
-        paste_out = paste.crop((0, paste.height - offset, paste.width, paste.height))
-        paste_in = paste.crop((0, 0, paste.width, paste.height - offset))
-        wrapped_alpha_composite(im, paste_out, (coord[0], 0))
-        wrapped_alpha_composite(im, paste_in, (coord[0], corners[1]))
+        Returns:
+            Image: Canvas with all sprites drawn (RGBA)
+        """
+        return Image.fromarray(self.canvas, "RGBA")
@@ -1,16 +1,46 @@
-from theia.color import Color, color_to_hex, distance_squared
-from PIL import ImageColor
+from theia.color import Color, color_to_hex, delta_e_2000, distance_squared, rgb_to_lab, rgb_to_oklab
+from collections import OrderedDict
+from functools import lru_cache
+from PIL import Image, ImageColor
+import hashlib
 import json
+import numpy as np
 import os
 import re
 import requests
+from typing import Callable, NamedTuple, Optional, Union
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
 
 # Extension to use for palette files
 # Palettes are saved as unencoded plain text, one color per line
 PALETTE_EXT = "txt"
 
+# Error diffusion kernels, as (dx, dy, weight) offsets from the current pixel
+# Every offset must satisfy dx + 2 * dy > 0 - see _error_diffusion
+DIFFUSION_KERNELS = {
+    "floyd-steinberg": [(1, 0, 7 / 16), (-1, 1, 3 / 16), (0, 1, 5 / 16), (1, 1, 1 / 16)],
+    "atkinson": [(1, 0, 1 / 8), (2, 0, 1 / 8), (-1, 1, 1 / 8), (0, 1, 1 / 8), (1, 1, 1 / 8), (0, 2, 1 / 8)],
+}
+DITHER_METHODS = ("floyd-steinberg", "atkinson", "bayer")
+
+# Directory to save precomputed palette lookup tables
+# Tables are saved as .npy files, keyed by palette contents and distance metric
+LUT_DIR = os.path.join("palettes", "lut")
+
 ColorPalette = dict[str, Color]
 
+# Palettes larger than this will use a KD-tree for nearest color lookups (if scipy is available)
+# Smaller palettes are faster to search with a brute-force broadcast
+KDTREE_THRESHOLD = 64
+
+# Maximum number of distance values to compute at once in brute-force searches
+# This keeps memory usage bounded when matching large arrays of colors
+BRUTE_FORCE_CHUNK = 2 ** 22
+
 
 def parse_palette(content: str,
                   allow_download: bool = True,
@@ -216,22 +246,562 @@ def download_lospec_palette(name: str) -> ColorPalette:
     return parse_palette_lines(["#" + c for c in r.text.splitlines()])
 
 
-def nearest_in_palette(target: Color, palette: ColorPalette, cache: dict[Color, Color] = None) -> Color:
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+class PaletteCache:
+    """Bounded least-recently-used cache of palette matches
+
+    One cache can be shared across many images, as long as they all use the same palette and metric
+    Hit, miss and eviction counts are available from cache_info()
+    """
+
+    def __init__(self, maxsize: Optional[int] = 65536):
+        """Create an empty cache
+
+        Args:
+            maxsize (int, optional): Maximum number of colors to keep. None for unbounded. Defaults to 65536.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._colors: OrderedDict[Color, Color] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._colors)
+
+    def __contains__(self, target: Color) -> bool:
+        return target in self._colors
+
+    def get(self, target: Color, default: Color = None) -> Optional[Color]:
+        """Look up the cached match for a color, counting a hit or miss
+
+        Args:
+            target (Color): Color to look up
+            default (Color, optional): Value to return if the color is not cached. Defaults to None.
+
+        Returns:
+            Color: Cached palette color, or the default
+        """
+        try:
+            color = self._colors[target]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._colors.move_to_end(target)
+        return color
+
+    def __setitem__(self, target: Color, color: Color):
+        self._colors[target] = color
+        self._colors.move_to_end(target)
+        if self.maxsize is not None and len(self._colors) > self.maxsize:
+            self._colors.popitem(last=False)
+            self.evictions += 1
+
+    def cache_info(self) -> CacheInfo:
+        """Get statistics for this cache
+
+        Returns:
+            CacheInfo: Hits, misses, evictions, maximum size and current size
+        """
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._colors))
+
+    def clear(self):
+        """Empty the cache and reset all statistics"""
+        self._colors.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+def nearest_in_palette(
+    target: Color, palette: ColorPalette, cache: Union[dict[Color, Color], PaletteCache] = None, metric: str = "rgb"
+) -> Color:
     """Find a color in a palette closest to a given color
 
     Args:
         target (Color): Color to match
         palette (ColorPalette): Palette with possible color options
-        cache (dict, optional): Optional cache to boost performance
+        cache (dict | PaletteCache, optional): Optional cache to boost performance
+        metric (str, optional): Distance metric - see PaletteMatcher. Defaults to "rgb".
 
     Returns:
         Color: One color from the given palette
     """
     # cache lookup
-    if cache and target in cache:
-        return cache.get(target)
+    if cache is not None:
+        cached = cache.get(target)
+        if cached is not None:
+            return cached
 
-    best_color = min(palette.values(), key=lambda c: distance_squared(c, target))
-    if cache:
+    if metric == "rgb":
+        best_color = min(palette.values(), key=lambda c: distance_squared(c, target))
+    else:
+        best_color = get_matcher(palette, metric).nearest_color(target)
+    if cache is not None:
         cache[target] = best_color
     return best_color
+
+
+def palette_array(palette: ColorPalette) -> np.ndarray:
+    """Convert the colors of a palette into an array, in palette order
+
+    Args:
+        palette (ColorPalette): Palette to convert
+
+    Returns:
+        np.ndarray: Array of RGB colors (uint8), with shape (n, 3)
+    """
+    return np.array([tuple(c)[:3] for c in palette.values()], dtype=np.uint8).reshape(-1, 3)
+
+
+class PaletteMatcher:
+    """Nearest color search over a fixed palette
+
+    Build this once per palette, then query whole arrays of colors at once
+    Large palettes are searched with a KD-tree, smaller palettes with a brute-force broadcast
+
+    The palette is converted into the metric's color space once, when the matcher is built
+    Use get_matcher to share matchers between calls with the same palette
+
+    Supported metrics:
+        rgb         -- Squared Euclidean distance (see color.distance_squared)
+        manhattan   -- Manhattan distance (see color.distance_manhattan)
+        lab         -- CIE76 distance in CIELAB (see color.distance_lab)
+        oklab       -- Euclidean distance in OKLab (see color.distance_oklab)
+        ciede2000   -- CIEDE2000 distance (see color.distance_ciede2000). Always uses brute-force search.
+    """
+
+    METRICS = ("rgb", "manhattan", "lab", "oklab", "ciede2000")
+
+    def __init__(self, palette: ColorPalette, metric: str = "rgb", use_kdtree: bool = None):
+        """Create a matcher for the given palette
+
+        Args:
+            palette (ColorPalette): Palette with possible color options
+            metric (str, optional): Distance metric to use. Defaults to "rgb".
+            use_kdtree (bool, optional): Force the KD-tree on or off. Defaults to choosing by palette size.
+
+        Raises:
+            ValueError: If the palette is empty or the metric is not recognised
+        """
+        if len(palette) < 1:
+            raise ValueError("Cannot match colors against an empty palette!")
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown distance metric: {metric}")
+
+        self.names = list(palette.keys())
+        self.colors = palette_array(palette)
+        self.metric = metric
+        self.points = self._convert(self.colors)
+
+        if use_kdtree is None:
+            use_kdtree = len(self.colors) > KDTREE_THRESHOLD
+        use_kdtree = use_kdtree and cKDTree is not None and metric != "ciede2000"
+        self.tree = cKDTree(self.points.astype(np.float64)) if use_kdtree else None
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    def query(self, colors: np.ndarray) -> np.ndarray:
+        """Find the index of the nearest palette color for every color in an array
+
+        Args:
+            colors (np.ndarray): Array of colors, with shape (..., 3)
+
+        Returns:
+            np.ndarray: Array of palette indexes, with shape (...)
+        """
+        colors = np.asarray(colors)
+        shape = colors.shape[:-1]
+        flat = colors.reshape(-1, colors.shape[-1])[:, :3]
+
+        if self.tree is not None:
+            p = 1 if self.metric == "manhattan" else 2
+            _, indexes = self.tree.query(self._convert(flat).astype(np.float64), p=p)
+        else:
+            indexes = self._brute_force(flat)
+        return indexes.astype(np.intp).reshape(shape)
+
+    def nearest(self, colors: np.ndarray, cache: PaletteCache = None) -> np.ndarray:
+        """Find the nearest palette color for every color in an array
+
+        If a cache is given, cached colors are reused and only the remainder are searched
+        This is most useful for arrays of unique colors - see apply_palette
+
+        Args:
+            colors (np.ndarray): Array of colors, with shape (..., 3)
+            cache (PaletteCache, optional): Cache of previous matches for this palette. Defaults to None.
+
+        Returns:
+            np.ndarray: Array of palette colors (uint8), with shape (..., 3)
+        """
+        if cache is None:
+            return self.colors[self.query(colors)]
+
+        colors = np.asarray(colors)
+        flat = colors.reshape(-1, colors.shape[-1])[:, :3]
+        result = np.empty((len(flat), 3), dtype=np.uint8)
+
+        keys = [tuple(c) for c in flat.tolist()]
+        missing = []
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                result[i] = cached
+
+        if missing:
+            found = self.colors[self.query(flat[missing])]
+            result[missing] = found
+            for i, color in zip(missing, found.tolist()):
+                cache[keys[i]] = tuple(color)
+        return result.reshape(colors.shape[:-1] + (3,))
+
+    def nearest_color(self, target: Color) -> Color:
+        """Find the nearest palette color for a single color
+
+        Args:
+            target (Color): Color to match
+
+        Returns:
+            Color: One color from the palette
+        """
+        return tuple(int(x) for x in self.nearest(np.array([target[:3]]))[0])
+
+    def _convert(self, colors: np.ndarray) -> np.ndarray:
+        """Convert sRGB colors into the color space used by this matcher's metric"""
+        if self.metric in ("lab", "ciede2000"):
+            return rgb_to_lab(colors)
+        elif self.metric == "oklab":
+            return rgb_to_oklab(colors)
+        return colors.astype(np.int32)
+
+    def _brute_force(self, flat: np.ndarray) -> np.ndarray:
+        """Brute-force search, comparing every color to every palette entry
+        Work is split into chunks to keep the distance matrix a reasonable size
+        """
+        result = np.empty(len(flat), dtype=np.intp)
+        step = max(1, BRUTE_FORCE_CHUNK // len(self.points))
+
+        for start in range(0, len(flat), step):
+            chunk = self._convert(flat[start:start + step])
+            if self.metric == "ciede2000":
+                dist = delta_e_2000(chunk[:, None, :], self.points[None, :, :])
+            elif self.metric == "manhattan":
+                dist = np.abs(chunk[:, None, :] - self.points[None, :, :]).sum(axis=2)
+            else:
+                # |x - p|^2 = |x|^2 - 2x.p + |p|^2, and |x|^2 doesn't change which p is nearest
+                # For 8-bit RGB every term is an integer below 2^24, so float32 is still exact
+                dtype = np.float32 if self.metric == "rgb" else np.float64
+                points = self.points.astype(dtype)
+                dist = (points * points).sum(axis=1) - 2 * (chunk.astype(dtype) @ points.T)
+            result[start:start + step] = dist.argmin(axis=1)
+        return result
+
+
+@lru_cache(maxsize=32)
+def _cached_matcher(colors: tuple[Color, ...], metric: str) -> PaletteMatcher:
+    return PaletteMatcher(convert_palette_to_named(colors), metric=metric)
+
+
+def get_matcher(palette: ColorPalette, metric: str = "rgb") -> PaletteMatcher:
+    """Get a (cached) PaletteMatcher for the given palette and metric
+    Repeated calls with the same palette colors reuse the converted palette and search structures
+
+    Args:
+        palette (ColorPalette): Palette with possible color options
+        metric (str, optional): Distance metric - see PaletteMatcher. Defaults to "rgb".
+
+    Returns:
+        PaletteMatcher: Matcher for the palette
+    """
+    return _cached_matcher(tuple(tuple(c)[:3] for c in palette.values()), metric)
+
+
+def palette_hash(palette: ColorPalette) -> str:
+    """Get a short hash of the colors in a palette
+    Color names are ignored, but color order is significant (it determines palette indexes)
+
+    Args:
+        palette (ColorPalette): Palette to hash
+
+    Returns:
+        str: Hex digest identifying the palette contents
+    """
+    return hashlib.sha1(palette_array(palette).tobytes()).hexdigest()[:16]
+
+
+def build_palette_lut(
+    palette: ColorPalette, bits: int = 6, metric: str = "rgb", lut_dir: str = LUT_DIR, save: bool = True
+) -> np.ndarray:
+    """Build a lookup table mapping every RGB color to its nearest palette index
+
+    The table has 2**bits entries per channel - 8 bits gives a full 256^3 table,
+    while 6 or 5 bits give a smaller 64^3 or 32^3 table matched at the center of each bucket
+
+    Tables are saved to (and loaded from) lut_dir as memory-mapped .npy files,
+    so building a table for a palette only needs to happen once
+
+    Args:
+        palette (ColorPalette): Palette to build a table for
+        bits (int, optional): Bits of precision per channel, from 1 to 8. Defaults to 6.
+        metric (str, optional): Distance metric - see PaletteMatcher. Defaults to "rgb".
+        lut_dir (str, optional): Directory to save/load tables. Defaults to "palettes/lut".
+        save (bool, optional): Whether to save the table to disk. Defaults to True.
+
+    Raises:
+        ValueError: If the number of bits is out of range
+
+    Returns:
+        np.ndarray: Lookup table of palette indexes, with shape (2**bits, 2**bits, 2**bits)
+    """
+    if not 1 <= bits <= 8:
+        raise ValueError("LUT bits must be between 1 and 8")
+
+    lut_path = os.path.join(lut_dir, f"{palette_hash(palette)}_{metric}_{bits}.npy")
+    if save and os.path.isfile(lut_path):
+        return np.load(lut_path, mmap_mode="r")
+
+    matcher = get_matcher(palette, metric)
+    levels = 1 << bits
+    shift = 8 - bits
+    dtype = np.uint8 if len(matcher) <= 256 else np.uint16
+
+    if save:
+        os.makedirs(lut_dir, exist_ok=True)
+        temp_path = lut_path + ".tmp"
+        lut = np.lib.format.open_memmap(temp_path, mode="w+", dtype=dtype, shape=(levels, levels, levels))
+    else:
+        lut = np.empty((levels, levels, levels), dtype=dtype)
+
+    # Match the center of each bucket, one red slice at a time to keep memory usage low
+    centers = ((np.arange(levels) << shift) + ((1 << shift) >> 1)).astype(np.uint8)
+    gg, bb = np.meshgrid(centers, centers, indexing="ij")
+    for r in range(levels):
+        rr = np.full_like(gg, centers[r])
+        lut[r] = matcher.query(np.stack((rr, gg, bb), axis=-1))
+
+    if save:
+        lut.flush()
+        del lut
+        os.replace(temp_path, lut_path)
+        return np.load(lut_path, mmap_mode="r")
+    return lut
+
+
+def quantize_image(image: Image, palette: ColorPalette, lut: np.ndarray) -> Image:
+    """Map every pixel of an image to a palette color using a precomputed lookup table
+    Alpha channels are kept intact
+
+    Args:
+        image (Image): Image to quantize
+        palette (ColorPalette): Palette the table was built from
+        lut (np.ndarray): Lookup table - see build_palette_lut
+
+    Returns:
+        Image: New image using only palette colors
+    """
+    mode = "RGBA" if "A" in image.getbands() else "RGB"
+    pixels = np.array(image.convert(mode))
+    pixels[..., :3] = palette_array(palette)[lut_palette_indexes(image, lut)]
+    return Image.fromarray(pixels)
+
+
+def lut_palette_indexes(image: Image, lut: np.ndarray) -> np.ndarray:
+    """Find the palette index for every pixel of an image using a precomputed lookup table
+
+    Args:
+        image (Image): Image to match
+        lut (np.ndarray): Lookup table - see build_palette_lut
+
+    Returns:
+        np.ndarray: Array of palette indexes, with shape (height, width)
+    """
+    shift = 8 - (lut.shape[0].bit_length() - 1)
+    rgb = np.asarray(image.convert("RGB")) >> shift
+    return lut[rgb[..., 0], rgb[..., 1], rgb[..., 2]]
+
+
+def convert_palette_to_named(colors: list[Color]) -> ColorPalette:
+    """Convert a list of colors into a ColorPalette
+    Colors are named by their position in the list
+
+    Args:
+        colors (list[Color]): List of colors
+
+    Returns:
+        ColorPalette: Palette dictionary mapping names to colors
+    """
+    return {str(i): tuple(c) for i, c in enumerate(colors)}
+
+
+def image_palette_indexes(image: Image, palette: ColorPalette, metric: str = "rgb") -> np.ndarray:
+    """Find the nearest palette index for every pixel of an image
+    Each unique color in the image is only matched once
+
+    Args:
+        image (Image): Image to match
+        palette (ColorPalette): Palette with possible color options
+        metric (str, optional): Distance metric - see PaletteMatcher. Defaults to "rgb".
+
+    Returns:
+        np.ndarray: Array of palette indexes, with shape (height, width)
+    """
+    unique_colors, inverse = _unique_colors(np.asarray(image.convert("RGB")))
+    indexes = get_matcher(palette, metric).query(unique_colors)
+    return indexes[inverse].reshape(image.height, image.width)
+
+
+def apply_palette(image: Image, palette: ColorPalette, metric: str = "rgb", cache: PaletteCache = None) -> Image:
+    """Replace every pixel of an image with the nearest palette color
+    Alpha channels are kept intact
+
+    Args:
+        image (Image): Image to recolor
+        palette (ColorPalette): Palette with possible color options
+        metric (str, optional): Distance metric - see PaletteMatcher. Defaults to "rgb".
+        cache (PaletteCache, optional): Cache to share matches between images. Defaults to None.
+
+    Returns:
+        Image: New image using only palette colors
+    """
+    mode = "RGBA" if "A" in image.getbands() else "RGB"
+    pixels = np.array(image.convert(mode))
+    unique_colors, inverse = _unique_colors(pixels[..., :3])
+    matched = get_matcher(palette, metric).nearest(unique_colors, cache=cache)
+    pixels[..., :3] = matched[inverse].reshape(image.height, image.width, 3)
+    return Image.fromarray(pixels)
+
+
+def _unique_colors(pixels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Find the unique RGB colors in an array of pixels, and the inverse index for each pixel"""
+    rgb = pixels.astype(np.uint32)
+    packed = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    unique, inverse = np.unique(packed.ravel(), return_inverse=True)
+    unique_colors = np.stack(((unique >> 16) & 255, (unique >> 8) & 255, unique & 255), axis=-1)
+    return unique_colors.astype(np.uint8), inverse.ravel()
+
+
+def bayer_matrix(size: int) -> np.ndarray:
+    """Build a normalized Bayer threshold matrix for ordered dithering
+
+    Args:
+        size (int): Width and height of the matrix. Must be a power of two.
+
+    Raises:
+        ValueError: If the size is not a power of two
+
+    Returns:
+        np.ndarray: Thresholds between -0.5 and 0.5, with shape (size, size)
+    """
+    if size < 1 or size & (size - 1):
+        raise ValueError("Bayer matrix size must be a power of two")
+
+    matrix = np.zeros((1, 1))
+    while len(matrix) < size:
+        matrix = np.block([[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]])
+    return (matrix + 0.5) / (size * size) - 0.5
+
+
+def dither(
+    image: Image,
+    palette: ColorPalette,
+    method: str = "floyd-steinberg",
+    metric: str = "rgb",
+    lut: np.ndarray = None,
+    bayer_size: int = 4,
+    strength: float = 1.0,
+) -> Image:
+    """Replace every pixel of an image with a palette color, using dithering to preserve shading
+    Alpha channels are kept intact
+
+    Supported methods:
+        floyd-steinberg -- Error diffusion with the Floyd-Steinberg kernel
+        atkinson        -- Error diffusion with the Atkinson kernel (only diffuses 3/4 of the error)
+        bayer           -- Ordered dithering with a Bayer threshold matrix
+
+    Args:
+        image (Image): Image to dither
+        palette (ColorPalette): Palette with possible color options
+        method (str, optional): Dithering method. Defaults to "floyd-steinberg".
+        metric (str, optional): Distance metric - see PaletteMatcher. Defaults to "rgb".
+        lut (np.ndarray, optional): Lookup table to use instead of searching - see build_palette_lut. Defaults to None.
+        bayer_size (int, optional): Size of the Bayer matrix, for ordered dithering. Defaults to 4.
+        strength (float, optional): Multiplier for the amount of dithering. Defaults to 1.0.
+
+    Raises:
+        ValueError: If the dithering method is not recognised
+
+    Returns:
+        Image: New image using only palette colors
+    """
+    if method not in DITHER_METHODS:
+        raise ValueError(f"Unknown dithering method: {method}")
+
+    mode = "RGBA" if "A" in image.getbands() else "RGB"
+    pixels = np.array(image.convert(mode))
+    colors = palette_array(palette)
+
+    if lut is not None:
+        shift = 8 - (lut.shape[0].bit_length() - 1)
+
+        def find_indexes(rgb):
+            rgb = rgb >> shift
+            return lut[rgb[..., 0], rgb[..., 1], rgb[..., 2]]
+
+    else:
+        find_indexes = get_matcher(palette, metric).query
+
+    if method == "bayer":
+        # Offset each pixel by a tiled threshold, scaled to the typical gap between palette colors
+        thresholds = bayer_matrix(bayer_size)
+        reps = (-(-image.height // bayer_size), -(-image.width // bayer_size))
+        thresholds = np.tile(thresholds, reps)[: image.height, : image.width]
+        spread = strength * 255 / np.cbrt(len(colors))
+        offset = pixels[..., :3] + spread * thresholds[..., None]
+        unique_colors, inverse = _unique_colors(np.clip(np.rint(offset), 0, 255).astype(np.uint8))
+        indexes = find_indexes(unique_colors)[inverse].reshape(image.height, image.width)
+    else:
+        indexes = _error_diffusion(pixels[..., :3], colors, find_indexes, DIFFUSION_KERNELS[method], strength)
+
+    pixels[..., :3] = colors[indexes]
+    return Image.fromarray(pixels)
+
+
+def _error_diffusion(
+    rgb: np.ndarray, colors: np.ndarray, find_indexes: Callable, kernel: list, strength: float
+) -> np.ndarray:
+    """Error diffusion dithering, returning the palette index for every pixel
+
+    Pixels can't be processed a whole row at a time, as each pixel depends on its left neighbour
+    Instead, pixels are processed in diagonal wavefronts where x + 2y is constant:
+    every kernel offset moves forward at least one wavefront, so each wavefront only depends on earlier ones
+    """
+    height, width = rgb.shape[:2]
+    pad = max(max(abs(dx), dy) for dx, dy, _ in kernel)
+    buffer = np.zeros((height + pad, width + 2 * pad, 3))
+    buffer[:height, pad:pad + width] = rgb
+    indexes = np.empty((height, width), dtype=np.intp)
+
+    for t in range(width + 2 * (height - 1)):
+        ys = np.arange(max(0, (t - width + 2) // 2), min(height - 1, t // 2) + 1)
+        xs = t - 2 * ys + pad
+        values = buffer[ys, xs]
+        found = find_indexes(np.clip(np.rint(values), 0, 255).astype(np.uint8))
+        indexes[ys, xs - pad] = found
+
+        error = (values - colors[found]) * strength
+        for dx, dy, weight in kernel:
+            buffer[ys + dy, xs + dx] += error * weight
+
+    return indexes
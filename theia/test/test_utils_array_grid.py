@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+import theia.grid as grid
+from theia.grid import ArrayGrid
+
+
+class TestArrayGrid(unittest.TestCase):
+    def setUp(self):
+        self.base = grid.build(size=50, num=6)
+        self.radial = grid.build_radial(size=100, num_angular=8, num_radius=3)
+
+    def test_build(self):
+        # Test vectorized builds match the list versions
+        self.assertEqual(ArrayGrid.build(50, 6).to_list(), self.base)
+        self.assertEqual(ArrayGrid.build(1000, 7).to_list(), grid.build(1000, 7))
+        self.assertEqual(ArrayGrid.build_radial(100, 8, 3).to_list(), self.radial)
+        self.assertEqual(ArrayGrid.build_radial(64, 5, 4, 30, False).to_list(), grid.build_radial(64, 5, 4, 30, False))
+
+    def test_round_trip(self):
+        # Test ragged grids convert to and from lists
+        g = ArrayGrid.from_list(self.radial)
+        self.assertEqual(g.num_rows, 4)
+        self.assertEqual(len(g), 25)
+        self.assertEqual(g.row_lengths.tolist(), [1, 8, 8, 8])
+        self.assertEqual(g.to_list(), self.radial)
+        np.testing.assert_array_equal(g.flatten(), grid.flatten(self.radial))
+
+    def test_shift(self):
+        # Test shifts match the list versions
+        g = ArrayGrid.from_list(self.base)
+        self.assertEqual(g.shift_rows(5, size=50, clamp=True).to_list(), grid.shift_rows(self.base, 5, size=50))
+        self.assertEqual(g.shift_columns(5, mod=3).to_list(), grid.shift_columns(self.base, 5, mod=3))
+
+    def test_triangle(self):
+        # Test triangles match the list versions
+        g = ArrayGrid.from_list(self.base)
+        self.assertEqual(g.triangle().to_list(), grid.triangle(self.base))
+        self.assertEqual(g.triangle(2, False).to_list(), grid.triangle(self.base, 2, False))
+
+    def test_transpose(self):
+        # Test transposing matches the list version, including ragged grids
+        self.assertEqual(ArrayGrid.from_list(self.base).transpose().to_list(), grid.transpose(self.base))
+        self.assertEqual(ArrayGrid.from_list(self.radial).transpose().to_list(), grid.transpose(self.radial))
+
+    def test_jitter(self):
+        # Test jitter stays within the variance, and clamps
+        g = ArrayGrid.build(50, 6)
+        rng = np.random.default_rng(0)
+        jittered = g.jitter(2, 5, rng=rng)
+        moved = np.abs(jittered.points - g.points)
+        self.assertTrue(((moved >= 2) & (moved < 5)).all())
+        jittered = g.jitter(max_variance=10, clamp=True, rng=rng)
+        self.assertTrue(((jittered.points >= 0) & (jittered.points <= 50)).all())
+        jittered = g.jitter(variance_list=[3], rng=rng)
+        self.assertTrue((jittered.points - g.points == 3).all())
+
+    def test_sparsify(self):
+        # Test sparsify keeps exactly the given percentage, keeping the row structure
+        g = ArrayGrid.from_list(self.radial)
+        result = g.sparsify(0.4, rng=np.random.default_rng(0))
+        self.assertEqual(len(result), 10)
+        self.assertEqual(result.num_rows, g.num_rows)
+        kept = set(grid.flatten(result.to_list()))
+        for row, result_row in zip(self.radial, result.to_list()):
+            self.assertEqual(result_row, [p for p in row if p in kept])
+
+    def test_apply(self):
+        # Test vectorized functions are applied to every point
+        g = ArrayGrid.from_list(self.base).apply(lambda p: p * 2)
+        self.assertEqual(g.to_list(), grid.apply(self.base, lambda p: (p[0] * 2, p[1] * 2)))
+
+
+if __name__ == "__main__":
+    unittest.main()
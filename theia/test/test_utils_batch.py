@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image, ImageDraw
+from theia.batch import color_array, glow_tensor, multiply_tensor, run_palette_batch, run_tensor_batch, stack_images
+from theia.channels import multiply
+from theia.outline import GlowMask, neon_mask
+
+colors = {"red": (255, 0, 0), "green": (0, 255, 0), "blue": (0, 0, 255)}
+
+
+class TestPaletteBatch(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.images = [(f"image{i}", Image.new("RGBA", (8, 8), (255, 255, 255, 200))) for i in range(2)]
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def check_output(self, paths):
+        expected = {os.path.join(self.tempdir.name, f"{i}_{c}.png") for i, _ in self.images for c in colors}
+        self.assertEqual(set(paths), expected)
+        result = Image.open(os.path.join(self.tempdir.name, "image1_green.png"))
+        self.assertEqual(result.getpixel((0, 0)), (0, 255, 0, 200))
+
+    def test_serial(self):
+        self.check_output(list(run_palette_batch(self.images, colors, multiply, self.tempdir.name, workers=1)))
+
+    def test_parallel(self):
+        self.check_output(list(run_palette_batch(self.images, colors, multiply, self.tempdir.name, workers=4)))
+
+    def test_background(self):
+        background = Image.new("RGBA", (4, 4), (0, 0, 0, 255))
+        list(run_palette_batch(self.images[:1], colors, multiply, self.tempdir.name, background, workers=2))
+        result = Image.open(os.path.join(self.tempdir.name, "image0_red.png"))
+        self.assertEqual(result.size, (8, 8))
+        self.assertEqual(result.getpixel((0, 0))[3], 255)
+
+
+class TestTensorBatch(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.images = []
+        for i in range(3):
+            im = Image.new("RGBA", (24, 24), (0, 0, 0, 0))
+            ImageDraw.Draw(im).ellipse((4 + i, 6, 16 + i, 18), fill=(40 * i, 200, 90, 180))
+            self.images.append((f"image{i}", im))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_multiply_tensor(self):
+        stack = stack_images([im for _, im in self.images])
+        result = multiply_tensor(stack, color_array(colors.values()))
+        self.assertEqual(result.shape, (3, 3, 24, 24, 4))
+        for n, (_, im) in enumerate(self.images):
+            for m, color in enumerate(colors.values()):
+                self.assertTrue(np.array_equal(result[n, m], np.asarray(multiply(im, color))))
+
+    def test_glow_tensor(self):
+        mask = neon_mask(self.images[0][1])
+        result = glow_tensor(mask, color_array(colors.values()))
+        for m, color in enumerate(colors.values()):
+            self.assertTrue(np.array_equal(result[m], np.asarray(GlowMask.apply(mask, color))))
+
+    def test_stack_sizes(self):
+        with self.assertRaises(ValueError):
+            stack_images([Image.new("RGBA", (2, 2)), Image.new("RGBA", (3, 2))])
+
+    def test_run_chunked(self):
+        # A tiny budget forces one color at a time, and the odd-sized image goes in its own group
+        images = self.images + [("small", Image.new("RGBA", (5, 3), (255, 255, 255, 255)))]
+        paths = list(run_tensor_batch(images, colors, self.tempdir.name, memory=1))
+        self.assertEqual(len(paths), 12)
+        result = Image.open(os.path.join(self.tempdir.name, "small_blue.png"))
+        self.assertEqual(result.size, (5, 3))
+        self.assertEqual(result.getpixel((0, 0)), (0, 0, 255, 255))
+
+    def test_matches_palette_batch(self):
+        background = Image.new("RGBA", (4, 4), (10, 20, 30, 255))
+        tensor = os.path.join(self.tempdir.name, "tensor")
+        serial = os.path.join(self.tempdir.name, "serial")
+        list(run_tensor_batch(self.images, colors, tensor, "neon", background))
+        list(run_palette_batch(self.images, colors, GlowMask.apply, serial, background, 1, neon_mask))
+        for name in os.listdir(serial):
+            expected = np.asarray(Image.open(os.path.join(serial, name)))
+            self.assertTrue(np.array_equal(np.asarray(Image.open(os.path.join(tensor, name))), expected))
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            list(run_tensor_batch(self.images, colors, self.tempdir.name, "sparkle"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from PIL import Image, ImageChops, ImageOps
+from theia.channels import invert_with_alpha, multiply, multiply_many, multiply_no_alpha, set_alpha_channel
+
+
+def random_image(mode: str = "RGBA", size: tuple[int, int] = (32, 24)) -> Image:
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 256, (size[1], size[0], 4), dtype=np.uint8), "RGBA").convert(mode)
+
+
+class TestMultiply(unittest.TestCase):
+    def test_matches_chops(self):
+        im = random_image()
+        for color in [(255, 0, 0), (200, 100, 37), (17, 255, 128, 90)]:
+            expected = ImageChops.multiply(im, Image.new("RGBA", im.size, color))
+            self.assertEqual(multiply(im, color).tobytes(), expected.tobytes())
+
+    def test_rgb(self):
+        im = random_image("RGB")
+        expected = ImageChops.multiply(im, Image.new("RGB", im.size, (10, 128, 250)))
+        self.assertEqual(multiply(im, (10, 128, 250)).tobytes(), expected.tobytes())
+        self.assertEqual(multiply_no_alpha(im, (10, 128, 250)).tobytes(), expected.tobytes())
+
+    def test_other_modes(self):
+        im = random_image("P")
+        result = multiply(im, (255, 0, 0))
+        self.assertEqual(result.mode, "RGBA")
+        expected = ImageChops.multiply(im.convert("RGBA"), Image.new("RGBA", im.size, (255, 0, 0)))
+        self.assertEqual(result.tobytes(), expected.tobytes())
+
+    def test_no_alpha_keeps_alpha(self):
+        im = random_image()
+        result = multiply_no_alpha(im, (100, 100, 100, 0))
+        self.assertEqual(result.getchannel("A").tobytes(), im.getchannel("A").tobytes())
+
+    def test_many(self):
+        im = random_image()
+        colors = [(255, 0, 0), (0, 255, 0), (12, 34, 56)]
+        results = multiply_many(im, colors)
+        self.assertEqual(len(results), 3)
+        for color, result in zip(colors, results):
+            self.assertEqual(result.tobytes(), multiply(im, color).tobytes())
+
+
+class TestInvert(unittest.TestCase):
+    def test_matches_original(self):
+        im = random_image()
+        r, g, b, a = im.split()
+        expected = ImageOps.invert(Image.merge("RGB", (r, g, b)))
+        expected.putalpha(a)
+        self.assertEqual(invert_with_alpha(im).tobytes(), expected.tobytes())
+
+    def test_modes(self):
+        self.assertEqual(invert_with_alpha(Image.new("L", (2, 2), 10)).getpixel((0, 0)), 245)
+        self.assertEqual(invert_with_alpha(Image.new("LA", (2, 2), (10, 20))).getpixel((0, 0)), (245, 20))
+        self.assertEqual(invert_with_alpha(Image.new("RGB", (2, 2), (0, 1, 2))).getpixel((0, 0)), (255, 254, 253))
+
+
+class TestSetAlpha(unittest.TestCase):
+    def test_copy(self):
+        im = random_image()
+        alpha = Image.new("L", im.size, 77)
+        result = set_alpha_channel(im, alpha)
+        self.assertEqual(result.getchannel("A").getextrema(), (77, 77))
+        self.assertEqual(result.getchannel("R").tobytes(), im.getchannel("R").tobytes())
+        self.assertNotEqual(im.getchannel("A").getextrema(), (77, 77))
+
+    def test_in_place(self):
+        im = random_image()
+        result = set_alpha_channel(im, Image.new("RGBA", im.size, (0, 0, 0, 5)), in_place=True)
+        self.assertIs(result, im)
+        self.assertEqual(im.getchannel("A").getextrema(), (0, 0))
+
+    def test_rgb(self):
+        result = set_alpha_channel(Image.new("RGB", (2, 2), (1, 2, 3)), Image.new("L", (2, 2), 9))
+        self.assertEqual(result.getpixel((0, 0)), (1, 2, 3, 9))
+        with self.assertRaises(ValueError):
+            set_alpha_channel(Image.new("RGB", (2, 2)), Image.new("L", (2, 2)), in_place=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
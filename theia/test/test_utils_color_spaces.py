@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+from theia.color import (
+    delta_e_2000,
+    distance_ciede2000,
+    distance_lab,
+    distance_oklab,
+    lab_to_rgb,
+    oklab_to_rgb,
+    rgb_to_lab,
+    rgb_to_oklab,
+)
+from theia.palettes import PaletteMatcher, nearest_in_palette
+
+palette = {
+    "red": (231, 76, 60),
+    "blue": (52, 152, 219),
+    "green": (46, 204, 113),
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+}
+
+
+class TestColorSpaces(unittest.TestCase):
+    def test_lab_white(self):
+        self.assertTrue(np.allclose(rgb_to_lab([255, 255, 255]), [100, 0, 0], atol=1e-3))
+
+    def test_lab_red(self):
+        self.assertTrue(np.allclose(rgb_to_lab([255, 0, 0]), [53.2408, 80.0925, 67.2032], atol=1e-3))
+
+    def test_oklab_white(self):
+        self.assertTrue(np.allclose(rgb_to_oklab([255, 255, 255]), [1, 0, 0], atol=1e-6))
+
+    def test_round_trip(self):
+        colors = np.random.default_rng(0).integers(0, 256, size=(200, 3))
+        self.assertTrue(np.allclose(lab_to_rgb(rgb_to_lab(colors)), colors))
+        self.assertTrue(np.allclose(oklab_to_rgb(rgb_to_oklab(colors)), colors))
+
+    def test_ciede2000_reference(self):
+        # Reference pairs from Sharma, Wu & Dalal (2005)
+        lab1 = [[50, 2.6772, -79.7751], [50, -1.3802, -84.2814], [2.0776, 0.0795, -1.1350], [50, 2.5, 0]]
+        lab2 = [[50, 0, -82.7485], [50, 0, -82.7485], [0.9033, -0.0636, -0.5514], [73, 25, -18]]
+        expected = [2.0425, 1.0000, 0.9082, 27.1492]
+        self.assertTrue(np.allclose(delta_e_2000(lab1, lab2), expected, atol=1e-4))
+
+    def test_ciede2000_symmetric(self):
+        self.assertAlmostEqual(distance_ciede2000((10, 200, 30), (40, 20, 90)),
+                               distance_ciede2000((40, 20, 90), (10, 200, 30)))
+
+
+class TestPerceptualMatching(unittest.TestCase):
+    def setUp(self):
+        self.colors = np.random.default_rng(2).integers(0, 256, size=(300, 3))
+
+    def check_metric(self, metric, distance):
+        expected = [min(palette.values(), key=lambda c: distance(c, tuple(t))) for t in self.colors]
+        for use_kdtree in (False, True):
+            matcher = PaletteMatcher(palette, metric=metric, use_kdtree=use_kdtree)
+            result = [tuple(int(x) for x in c) for c in matcher.nearest(self.colors)]
+            self.assertEqual(result, expected)
+
+    def test_lab(self):
+        self.check_metric("lab", distance_lab)
+
+    def test_oklab(self):
+        self.check_metric("oklab", distance_oklab)
+
+    def test_ciede2000(self):
+        self.check_metric("ciede2000", distance_ciede2000)
+
+    def test_nearest_in_palette(self):
+        target = (120, 40, 160)
+        expected = min(palette.values(), key=lambda c: distance_oklab(c, target))
+        self.assertEqual(nearest_in_palette(target, palette, metric="oklab"), expected)
+
+    def test_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            PaletteMatcher(palette, metric="hsv")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from math import cos, pi
+
+import numpy as np
+
+from theia.color import cosine_palette, cosine_palette_image, cosine_palette_lut, interpolate_cosine
+
+
+class TestCosinePalette(unittest.TestCase):
+    def setUp(self):
+        # Rainbow-ish palette with different parameters per channel
+        self.params = ((128, 128, 128), (127, 127, 127), (255, 255, 255), (0, 84, 170))
+
+    def reference(self, t):
+        a, b, c, d = [[v / 255 for v in p] for p in self.params]
+        return tuple(
+            int(min(max(0, (a[i] + b[i] * cos(2 * pi * (c[i] * t + d[i]))) * 255), 255)) for i in range(3)
+        )
+
+    def test_single(self):
+        # Test each channel uses its own parameters
+        for t in [0, 0.1, 0.5, 0.9]:
+            self.assertEqual(interpolate_cosine(*self.params, t), self.reference(t))
+        self.assertNotEqual(len(set(interpolate_cosine(*self.params, 0.3))), 1)
+
+    def test_list(self):
+        # Test lists of t values give a list of colors
+        t = [0, 0.25, 0.5]
+        self.assertEqual(interpolate_cosine(*self.params, t), [self.reference(x) for x in t])
+
+    def test_array(self):
+        # Test any shape of t values, and batches of parameters
+        self.assertEqual(cosine_palette(*self.params, np.zeros((4, 5))).shape, (4, 5, 3))
+        batch = [np.array([p, p])[:, None, :] for p in self.params]
+        result = cosine_palette(*batch, np.linspace(0, 1, 7))
+        self.assertEqual(result.shape, (2, 7, 3))
+        np.testing.assert_array_equal(result[0], cosine_palette(*self.params, np.linspace(0, 1, 7)))
+
+    def test_image(self):
+        # Test palette strips run from t=0 to t=1
+        image = cosine_palette_image(*self.params, (64, 8))
+        self.assertEqual(image.size, (64, 8))
+        self.assertEqual(image.getpixel((0, 7)), self.reference(0))
+        self.assertEqual(image.getpixel((63, 0)), self.reference(1))
+
+    def test_lut(self):
+        # Test palettes can be compiled for fast sampling
+        lut = cosine_palette_lut(*self.params, 1024)
+        self.assertEqual(lut.size, 1024)
+        self.assertEqual(lut.sample(0.5), self.reference(512 / 1023))
+
+
+if __name__ == "__main__":
+    unittest.main()
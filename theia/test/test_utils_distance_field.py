@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from theia.outline import DistanceField, GlowMask, distance_transform
+
+
+def brute_force_distance(mask: np.ndarray) -> np.ndarray:
+    ys, xs = np.nonzero(mask)
+    yy, xx = np.indices(mask.shape)
+    return np.sqrt(((yy[..., None] - ys) ** 2 + (xx[..., None] - xs) ** 2).min(axis=-1))
+
+
+class TestDistanceTransform(unittest.TestCase):
+    def test_exact(self):
+        # Test distances exactly match a brute force search
+        rng = np.random.default_rng(0)
+        for shape in [(40, 50), (1, 9), (9, 1), (31, 31)]:
+            mask = rng.random(shape) < 0.05
+            mask[0, -1] = True
+            np.testing.assert_allclose(distance_transform(mask), brute_force_distance(mask))
+
+    def test_empty_columns(self):
+        # Test a single point, where most columns have nothing to measure to
+        mask = np.zeros((20, 30), dtype=bool)
+        mask[12, 4] = True
+        np.testing.assert_allclose(distance_transform(mask), brute_force_distance(mask))
+
+
+class TestDistanceField(unittest.TestCase):
+    def setUp(self):
+        self.image = Image.new("RGBA", (80, 60), (0, 0, 0, 0))
+        ImageDraw.Draw(self.image).rectangle((30, 20, 49, 39), fill=(255, 255, 255, 255))
+        self.field = DistanceField(self.image)
+
+    def test_signs(self):
+        # Test distances are negative inside the shape and positive outside
+        self.assertLess(self.field.distance[30, 40], 0)
+        self.assertAlmostEqual(float(self.field.distance[30, 55]), 5.5)
+        self.assertAlmostEqual(float(self.field.distance[30, 40]), -9.5)
+
+    def test_hard_layer(self):
+        # Test hard layers cover everything within the width of the shape
+        alpha = np.asarray(self.field.layer(6, falloff=0))
+        self.assertEqual(alpha[30, 55], 255)
+        self.assertEqual(alpha[30, 56], 0)
+        self.assertEqual(alpha[14, 40], 255)
+        self.assertEqual(alpha[16, 26], 255)
+        self.assertEqual(alpha[15, 25], 0)
+
+    def test_falloff(self):
+        # Test layers fade out linearly over the falloff distance
+        alpha = np.asarray(self.field.layer(8, falloff=4))
+        self.assertEqual(alpha[30, 53], 255)
+        self.assertEqual(alpha[30, 55], 159)
+        self.assertEqual(alpha[30, 58], 0)
+
+    def test_masks(self):
+        # Test the field builds reusable masks for outlines, glows and shadows
+        outline = self.field.outline_mask(4)
+        self.assertIsInstance(outline, GlowMask)
+        self.assertEqual(outline.apply((255, 0, 0)).getpixel((52, 30)), (255, 0, 0, 255))
+        self.assertEqual(outline.apply((255, 0, 0)).getpixel((40, 30)), (255, 255, 255, 255))
+        self.assertEqual(len(self.field.neon_mask(2, 4).layers), 2)
+
+        shadow = self.field.drop_shadow(radius=4, offset=(6, 6))
+        self.assertEqual(shadow.size, self.image.size)
+        self.assertGreater(shadow.getpixel((53, 43))[3], 0)
+        self.assertEqual(shadow.getpixel((10, 10))[3], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
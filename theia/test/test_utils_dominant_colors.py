@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+from PIL import Image
+from theia.color import DOMINANT_COLOR_METHODS, color_histogram, dominant_colors
+
+red = (200, 30, 30)
+green = (30, 160, 60)
+blue = (20, 40, 200)
+
+
+def striped_image():
+    # Half red, a quarter each of green and blue, with a little noise
+    pixels = np.zeros((64, 128, 3))
+    pixels[:, :64] = red
+    pixels[:, 64:96] = green
+    pixels[:, 96:] = blue
+    pixels += np.random.default_rng(0).normal(0, 4, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+class TestDominantColors(unittest.TestCase):
+    def setUp(self):
+        self.image = striped_image()
+
+    def test_histogram(self):
+        colors, counts = color_histogram(Image.new("RGB", (10, 10), (255, 0, 0)))
+        self.assertTrue(np.array_equal(colors, [[255, 0, 0]]))
+        self.assertTrue(np.array_equal(counts, [100]))
+
+    def test_histogram_ignores_transparent(self):
+        image = Image.new("RGBA", (10, 10), (255, 0, 0, 0))
+        image.paste((0, 0, 255, 255), (0, 0, 5, 10))
+        colors, counts = color_histogram(image)
+        self.assertTrue(np.array_equal(colors, [[0, 0, 255]]))
+
+    def test_methods(self):
+        for method in DOMINANT_COLOR_METHODS:
+            result = dominant_colors(self.image, 3, method=method)
+            self.assertEqual(len(result), 3)
+            self.assertAlmostEqual(sum(share for _, share in result), 1)
+
+            # Most common first, and each stripe should be found
+            self.assertAlmostEqual(result[0][1], 0.5, places=2)
+            for expected in (red, green, blue):
+                self.assertTrue(any(np.abs(np.subtract(color, expected)).max() <= 4 for color, _ in result), method)
+
+    def test_deterministic(self):
+        first = dominant_colors(self.image, 4, method="kmeans", seed=5)
+        self.assertEqual(first, dominant_colors(self.image, 4, method="kmeans", seed=5))
+
+    def test_few_colors(self):
+        result = dominant_colors(Image.new("RGB", (8, 8), (10, 20, 30)), 5, method="octree")
+        self.assertEqual(result, [((10, 20, 30), 1.0)])
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            dominant_colors(self.image, 3, method="random")
+
+    def test_invalid_k(self):
+        for method in DOMINANT_COLOR_METHODS:
+            with self.assertRaises(ValueError):
+                dominant_colors(self.image, 0, method=method)
+
+    def test_octree_single_color(self):
+        # Merging all the way up to the root should stop there, with every pixel in one color
+        noise = np.random.default_rng(1).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        result = dominant_colors(Image.fromarray(noise), 1, method="octree")
+        self.assertEqual(len(result), 1)
+        self.assertAlmostEqual(result[0][1], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
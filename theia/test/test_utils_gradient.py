@@ -0,0 +1,150 @@
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from theia.color import (
+    GradientLUT,
+    gradient,
+    gradient_array,
+    gradient_image,
+    gradient_positions,
+    interpolate,
+    random_from_gradient,
+)
+
+
+class TestGradientArray(unittest.TestCase):
+    def setUp(self):
+        self.stops = {0: (255, 0, 0), 0.25: (0, 255, 0), 0.5: (0, 0, 255), 1: (255, 255, 255)}
+
+    def test_matches_gradient(self):
+        # Test the vectorized gradient matches the scalar version
+        t = np.linspace(0, 1, 101)
+        expected = [gradient(self.stops, x) for x in t]
+        self.assertEqual([tuple(c) for c in gradient_array(self.stops, t)], expected)
+
+    def test_unsorted_stops(self):
+        # Test stops don't need to be in order
+        unsorted = {1: (255, 255, 255), 0: (255, 0, 0), 0.5: (0, 0, 255), 0.25: (0, 255, 0)}
+        t = np.linspace(0, 1, 11)
+        np.testing.assert_array_equal(gradient_array(unsorted, t), gradient_array(self.stops, t))
+
+    def test_clamped(self):
+        # Test values outside the stops are clamped to the end colors
+        result = gradient_array(self.stops, np.array([-1, 2]))
+        self.assertEqual([tuple(c) for c in result], [(255, 0, 0), (255, 255, 255)])
+
+    def test_easing(self):
+        # Test easing functions are applied between stops
+        def f(x):
+            return x * (2 - x)
+
+        stops = {0: (255, 0, 255), 1: (0, 255, 0)}
+        expected = interpolate(stops[0], stops[1], 0.5, f)
+        self.assertEqual(tuple(gradient_array(stops, 0.5, f)), expected)
+
+    def test_shape(self):
+        # Test any shape of t values is supported
+        self.assertEqual(gradient_array(self.stops, np.zeros((4, 5))).shape, (4, 5, 3))
+        self.assertEqual(gradient_array({0.5: (1, 2, 3)}, np.zeros(4)).tolist(), [[1, 2, 3]] * 4)
+
+
+class TestGradientImage(unittest.TestCase):
+    def setUp(self):
+        self.stops = {0: (255, 0, 0), 0.5: (0, 255, 0), 1: (0, 0, 255)}
+
+    def test_horizontal(self):
+        # Test each column is the gradient at that position
+        image = gradient_image(self.stops, (32, 8))
+        self.assertEqual(image.mode, "RGBA")
+        self.assertEqual(image.size, (32, 8))
+        for x in range(32):
+            expected = gradient(self.stops, x / 31) + (255,)
+            self.assertEqual(image.getpixel((x, 0)), expected)
+            self.assertEqual(image.getpixel((x, 7)), expected)
+
+    def test_vertical(self):
+        # Test vertical gradients are horizontal gradients on their side
+        horizontal = gradient_image(self.stops, (32, 8))
+        vertical = gradient_image(self.stops, (8, 32), "vertical")
+        self.assertEqual(vertical.tobytes(), horizontal.transpose(Image.TRANSPOSE).tobytes())
+
+    def test_radial(self):
+        # Test radial gradients run from the center to the corners
+        image = gradient_image(self.stops, (33, 33), "radial")
+        self.assertEqual(image.getpixel((16, 16)), (255, 0, 0, 255))
+        for corner in [(0, 0), (32, 0), (0, 32), (32, 32)]:
+            self.assertEqual(image.getpixel(corner), (0, 0, 255, 255))
+
+    def test_positions(self):
+        # Test positions stay within 0..1 for every direction
+        for direction in ["horizontal", "vertical", "radial", "angular", "diamond"]:
+            t = gradient_positions((17, 9), direction)
+            self.assertEqual(t.shape, (9, 17))
+            self.assertGreaterEqual(t.min(), 0)
+            self.assertLessEqual(t.max(), 1)
+        self.assertEqual(gradient_positions((1, 1), "radial").tolist(), [[0]])
+
+    def test_unknown_direction(self):
+        with self.assertRaises(ValueError):
+            gradient_image(self.stops, (8, 8), "spiral")
+
+
+class TestGradientLUT(unittest.TestCase):
+    def setUp(self):
+        self.stops = {0: (255, 0, 0), 0.5: (0, 255, 0), 1: (0, 0, 255)}
+        self.lut = GradientLUT(self.stops, 1024)
+
+    def test_table(self):
+        # Test table entries are the gradient at evenly spaced positions
+        self.assertEqual(self.lut.table.shape, (1024, 3))
+        for i in [0, 100, 511, 1023]:
+            self.assertEqual(tuple(self.lut.table[i]), gradient(self.stops, i / 1023))
+
+    def test_sample(self):
+        # Test sampling rounds to the nearest table entry, and clamps
+        self.assertEqual(self.lut.sample(0), (255, 0, 0))
+        self.assertEqual(self.lut.sample(1), (0, 0, 255))
+        self.assertEqual(self.lut.sample(2), (0, 0, 255))
+        self.assertEqual(self.lut.sample(0.25), tuple(self.lut.table[256]))
+
+    def test_sample_many(self):
+        # Test batch sampling matches single sampling
+        t = np.random.default_rng(0).random(100)
+        expected = [self.lut.sample(x) for x in t]
+        self.assertEqual([tuple(c) for c in self.lut.sample_many(t)], expected)
+
+    def test_sample_midpoints(self):
+        # Test single and batch sampling round the same way, even exactly between two entries
+        for size in [4, 256]:
+            lut = GradientLUT(self.stops, size)
+            t = (np.arange(size - 1) + 0.5) / (size - 1)
+            self.assertEqual([tuple(c) for c in lut.sample_many(t)], [lut.sample(x) for x in t])
+
+    def test_random(self):
+        # Test random colors are all from the table, and repeatable with a seed
+        colors = self.lut.random(1000, seed=1)
+        self.assertEqual(colors.shape, (1000, 3))
+        np.testing.assert_array_equal(colors, self.lut.random(1000, seed=1))
+        table = {tuple(c) for c in self.lut.table}
+        self.assertTrue(all(tuple(c) in table for c in colors))
+        self.assertIn(random_from_gradient(self.lut), table)
+
+    def test_apply(self):
+        # Test grayscale images are mapped like a colormap, keeping transparency
+        gray = Image.fromarray(np.tile(np.arange(256, dtype=np.uint8), (4, 1)), "L").convert("LA")
+        gray.putalpha(100)
+        result = GradientLUT(self.stops).apply(gray)
+        self.assertEqual(result.mode, "RGBA")
+        self.assertEqual(result.getpixel((0, 0)), (255, 0, 0, 100))
+        self.assertEqual(result.getpixel((255, 3)), (0, 0, 255, 100))
+        self.assertEqual(result.getpixel((100, 0))[:3], gradient(self.stops, 100 / 255))
+
+    def test_too_small(self):
+        with self.assertRaises(ValueError):
+            GradientLUT(self.stops, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
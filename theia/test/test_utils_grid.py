@@ -1,4 +1,5 @@
 import unittest
+from random import Random
 import theia.grid as grid
 
 grid_test_base = [
@@ -15,6 +16,20 @@ class TestGrid(unittest.TestCase):
     def test_build(self):
         self.assertEqual(grid.build(size=50, num=6), grid_test_base)
 
+    def test_sparsify(self):
+        # Test sparsify keeps exactly the given percentage, in order
+        result = grid.sparsify(grid_test_base, 0.25, rng=Random(1))
+        self.assertEqual(len(grid.flatten(result)), 9)
+        kept = set(grid.flatten(result))
+        self.assertEqual(result, [[p for p in row if p in kept] for row in grid_test_base])
+        self.assertEqual(result, grid.sparsify(grid_test_base, 0.25, rng=Random(1)))
+
+    def test_sparsify_ragged(self):
+        # Test sparsify works when rows are different lengths
+        radial = grid.build_radial(size=100, num_angular=8, num_radius=3)
+        self.assertEqual(len(grid.flatten(grid.sparsify(radial, 1))), 25)
+        self.assertEqual(len(grid.flatten(grid.sparsify(radial, 0.6))), 15)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from PIL import Image
+from theia.image import images_from_path, iter_from_path, iter_images_from_path
+
+
+class TestImageLoading(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.dir = self.tempdir.name
+        for i, name in enumerate(["c.png", "a.jpg", "b.PNG"]):
+            Image.new("RGB", (4, 4), (i * 100, 0, 0)).save(os.path.join(self.dir, name))
+
+        # Things that shouldn't be loaded
+        with open(os.path.join(self.dir, "notes.txt"), "w") as f:
+            f.write("not an image")
+        os.makedirs(os.path.join(self.dir, "folder.png"))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_paths_filtered_and_sorted(self):
+        names = [os.path.basename(p) for p in images_from_path(self.dir)]
+        self.assertEqual(names, ["a.jpg", "b.PNG", "c.png"])
+
+    def test_input_root(self):
+        paths = images_from_path("c.png", input_root=self.dir)
+        self.assertEqual(paths, [os.path.join(self.dir, "c.png")])
+        self.assertEqual(images_from_path("missing.png", input_root=self.dir), [])
+
+    def test_lazy_loading(self):
+        images = iter_from_path(self.dir)
+        name, image = next(images)
+        self.assertEqual(name, "a")
+        self.assertEqual(image.mode, "RGBA")
+        self.assertEqual([n for n, _ in images], ["b", "c"])
+
+    def test_prefetch_order(self):
+        expected = [image.tobytes() for image in iter_images_from_path(self.dir)]
+        for prefetch in (1, 2, 8):
+            result = [image.tobytes() for image in iter_images_from_path(self.dir, prefetch=prefetch)]
+            self.assertEqual(result, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
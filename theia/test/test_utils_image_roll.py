@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from theia.image import roll, swap_quadrants
+
+
+class TestRoll(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.pixels = rng.integers(0, 256, (30, 45, 4), dtype=np.uint8)
+        self.image = Image.fromarray(self.pixels, "RGBA")
+
+    def test_roll(self):
+        # Test offsets wrap around the edges, including negative and oversized offsets
+        for dx, dy in [(0, 0), (10, 3), (-7, 12), (100, -65)]:
+            expected = np.roll(self.pixels, (dy, dx), axis=(0, 1))
+            self.assertEqual(roll(self.image, dx, dy).tobytes(), expected.tobytes())
+
+    def test_swap_quadrants(self):
+        # Test quadrants are swapped in place, including non-square images
+        expected = np.roll(self.pixels, (-15, -22), axis=(0, 1))
+        image = self.image.copy()
+        self.assertIs(swap_quadrants(image), image)
+        self.assertEqual(image.tobytes(), expected.tobytes())
+
+    def test_swap_quadrants_square(self):
+        # Test each quadrant moves to the opposite corner
+        image = Image.new("L", (4, 4))
+        image.putpixel((0, 0), 255)
+        image.putpixel((3, 3), 128)
+        swap_quadrants(image)
+        self.assertEqual(image.getpixel((2, 2)), 255)
+        self.assertEqual(image.getpixel((1, 1)), 128)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+from theia.color import clamp
+from theia.outline import (
+    apply_outline,
+    content_box,
+    drop_shadow,
+    neon_glow,
+    neon_mask,
+    outline_mask,
+    pyramid_blur,
+)
+
+red = (231, 76, 60)
+blue = (52, 152, 219)
+
+
+def sample_image():
+    image = Image.new("RGBA", (96, 80), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((30, 20, 60, 50), fill=(255, 255, 255, 255))
+    draw.rectangle((5, 5, 15, 30), fill=(20, 200, 20, 128))
+    return image
+
+
+def blurred_outline(im, color, width, softness):
+    # Outline by blurring the full RGBA image, to check the alpha-only masks against
+    r, g, b = Image.new("RGB", im.size, color).split()
+    a = im.filter(ImageFilter.GaussianBlur(width)).getchannel("A")
+    result = Image.merge("RGBA", (r, g, b, a.point(lambda x: clamp(x * (256 - softness)))))
+    result.alpha_composite(im)
+    return result
+
+
+def full_drop_shadow(im, radius, color, strength, offset):
+    # Drop shadow processing the whole canvas, to check the cropped version against
+    r, g, b = Image.new("RGB", im.size, color).split()
+    a = im.getchannel("A").point(lambda x: clamp(x * strength))
+    shadow = Image.merge("RGBA", (r, g, b, a)).filter(ImageFilter.GaussianBlur(radius))
+    canvas = Image.new("RGBA", [sum(x) for x in zip(im.size, offset)], (255, 255, 255, 0))
+    canvas.paste(shadow, offset, shadow)
+    return Image.alpha_composite(canvas.crop((0, 0) + im.size), im)
+
+
+class TestOutlineMask(unittest.TestCase):
+    def setUp(self):
+        self.image = sample_image()
+
+    def test_outline_mask_reusable(self):
+        mask = outline_mask(self.image, width=6, softness=64)
+        self.assertEqual(mask.apply(red).tobytes(), blurred_outline(self.image, red, 6, 64).tobytes())
+        self.assertEqual(mask.apply(blue).tobytes(), blurred_outline(self.image, blue, 6, 64).tobytes())
+
+    def test_neon_mask_layers(self):
+        mask = neon_mask(self.image, width=2, glowfactor=4)
+        self.assertEqual(len(mask.layers), 2)
+        expected = blurred_outline(blurred_outline(self.image, blue, 2, 32), blue, 8, 255)
+        self.assertEqual(mask.apply(blue).tobytes(), expected.tobytes())
+        self.assertEqual(neon_glow(self.image, blue, 2, 4).tobytes(), expected.tobytes())
+
+    def test_outline_color(self):
+        result = apply_outline(self.image, red)
+        # Just outside the circle should be the outline color, the middle should be untouched
+        self.assertEqual(result.getpixel((62, 35))[:3], red)
+        self.assertEqual(result.getpixel((45, 35)), (255, 255, 255, 255))
+
+
+def max_difference(a, b):
+    return np.abs(np.asarray(a, dtype=int) - np.asarray(b, dtype=int)).max()
+
+
+class TestContentCropping(unittest.TestCase):
+    def setUp(self):
+        # Small icons on a large transparent canvas, one touching the edge
+        self.image = Image.new("RGBA", (400, 300), (0, 0, 0, 0))
+        self.image.paste(sample_image(), (150, 100))
+        ImageDraw.Draw(self.image).rectangle((380, 0, 399, 20), fill=(200, 20, 20, 255))
+
+    def test_content_box(self):
+        self.assertEqual(content_box(sample_image()), (5, 5, 61, 51))
+        self.assertEqual(content_box(sample_image(), 10), (0, 0, 71, 61))
+        self.assertIsNone(content_box(Image.new("RGBA", (10, 10))))
+
+    def test_outline_cropped(self):
+        # Test only the content is processed, with exactly the same result
+        mask = outline_mask(self.image, width=6, softness=64)
+        self.assertLess(mask.image.width * mask.image.height, 400 * 300)
+        self.assertEqual(mask.apply(red).tobytes(), blurred_outline(self.image, red, 6, 64).tobytes())
+
+        expected = blurred_outline(blurred_outline(self.image, blue, 2, 32), blue, 8, 255)
+        self.assertEqual(neon_glow(self.image, blue, 2, 4).tobytes(), expected.tobytes())
+
+    def test_drop_shadow_cropped(self):
+        expected = full_drop_shadow(self.image, 6, red, 0.5, (4, 9))
+        self.assertEqual(drop_shadow(self.image, 6, red, 0.5, (4, 9)).tobytes(), expected.tobytes())
+
+    def test_empty(self):
+        empty = Image.new("RGBA", (50, 40))
+        self.assertEqual(apply_outline(empty, red).getpixel((25, 20)), red + (0,))
+        self.assertEqual(drop_shadow(empty).tobytes(), full_drop_shadow(empty, 8, (0, 0, 0), 0.8, (8, 8)).tobytes())
+
+
+class TestPyramidBlur(unittest.TestCase):
+    def setUp(self):
+        # Content is kept away from the edges, which are only handled approximately
+        self.image = Image.new("RGBA", (400, 360), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(self.image)
+        draw.ellipse((110, 100, 250, 210), fill=(255, 255, 255, 255))
+        draw.line((110, 260, 290, 240), fill=(255, 200, 0, 255), width=4)
+
+    def test_small_radius_exact(self):
+        # Test small radii fall back to the exact blur
+        alpha = self.image.getchannel("A")
+        self.assertEqual(pyramid_blur(alpha, 6).tobytes(), alpha.filter(ImageFilter.GaussianBlur(6)).tobytes())
+
+    def test_error_bound(self):
+        # Test large radii stay within the documented error bound
+        alpha = self.image.getchannel("A")
+        for radius in [8, 16, 24, 32]:
+            exact = alpha.filter(ImageFilter.GaussianBlur(radius))
+            self.assertLessEqual(max_difference(pyramid_blur(alpha, radius), exact), 2, radius)
+
+    def test_color_bands(self):
+        # Test color at alpha edges isn't skewed by premultiplied resizing
+        for radius in [16, 32]:
+            exact = self.image.filter(ImageFilter.GaussianBlur(radius))
+            self.assertLessEqual(max_difference(pyramid_blur(self.image, radius), exact), 2, radius)
+
+    def test_approximate_effects(self):
+        # Test approximate glows and shadows closely match the exact versions
+        exact = neon_glow(self.image, blue, 4, 8)
+        self.assertLessEqual(max_difference(neon_glow(self.image, blue, 4, 8, approximate=True), exact), 3)
+        exact = drop_shadow(self.image, radius=16)
+        self.assertLessEqual(max_difference(drop_shadow(self.image, radius=16, approximate=True), exact), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+from PIL import Image
+from theia.palettes import PaletteCache, apply_palette, nearest_in_palette
+
+palette = {
+    "red": (231, 76, 60),
+    "blue": (52, 152, 219),
+    "white": (255, 255, 255),
+}
+
+
+class TestPaletteCache(unittest.TestCase):
+    def test_empty_cache_is_filled(self):
+        cache = {}
+        nearest_in_palette((250, 80, 50), palette, cache)
+        self.assertEqual(cache, {(250, 80, 50): (231, 76, 60)})
+
+    def test_hits_and_misses(self):
+        cache = PaletteCache()
+        nearest_in_palette((250, 80, 50), palette, cache)
+        nearest_in_palette((250, 80, 50), palette, cache)
+        nearest_in_palette((10, 150, 200), palette, cache)
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 2, 2))
+
+    def test_lru_eviction(self):
+        cache = PaletteCache(maxsize=2)
+        cache[(1, 1, 1)] = (255, 255, 255)
+        cache[(2, 2, 2)] = (255, 255, 255)
+        cache.get((1, 1, 1))
+        cache[(3, 3, 3)] = (255, 255, 255)
+
+        # (2, 2, 2) was least recently used, so it should be evicted first
+        self.assertIn((1, 1, 1), cache)
+        self.assertNotIn((2, 2, 2), cache)
+        self.assertEqual(cache.cache_info().evictions, 1)
+
+    def test_clear(self):
+        cache = PaletteCache()
+        cache[(1, 1, 1)] = (255, 255, 255)
+        cache.get((1, 1, 1))
+        cache.clear()
+        self.assertEqual(tuple(cache.cache_info()), (0, 0, 0, 65536, 0))
+
+    def test_shared_across_images(self):
+        cache = PaletteCache()
+        pixels = np.random.default_rng(0).integers(0, 256, size=(8, 8, 4), dtype=np.uint8)
+        image = Image.fromarray(pixels)
+        first = apply_palette(image, palette, cache=cache)
+        misses = cache.cache_info().misses
+
+        # The second image has the same colors, so everything should be a hit
+        second = apply_palette(image, palette, cache=cache)
+        self.assertEqual(first.tobytes(), second.tobytes())
+        self.assertEqual(first.tobytes(), apply_palette(image, palette).tobytes())
+        self.assertEqual(cache.cache_info().misses, misses)
+        self.assertEqual(cache.cache_info().hits, misses)
+
+
+if __name__ == "__main__":
+    unittest.main()
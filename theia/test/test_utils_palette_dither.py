@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+from PIL import Image
+from theia.palettes import DIFFUSION_KERNELS, PaletteMatcher, bayer_matrix, build_palette_lut, dither
+
+palette = {
+    "black": (0, 0, 0),
+    "red": (231, 76, 60),
+    "blue": (52, 152, 219),
+    "white": (255, 255, 255),
+}
+
+
+def reference_diffusion(pixels, method):
+    # Straightforward pixel-by-pixel error diffusion, to check the vectorized version against
+    matcher = PaletteMatcher(palette)
+    buffer = pixels.astype(float)
+    height, width = buffer.shape[:2]
+    result = np.zeros_like(pixels)
+    for y in range(height):
+        for x in range(width):
+            value = buffer[y, x]
+            color = matcher.nearest(np.clip(np.rint(value), 0, 255).astype(np.uint8)[None])[0]
+            result[y, x] = color
+            for dx, dy, weight in DIFFUSION_KERNELS[method]:
+                if 0 <= x + dx < width and 0 <= y + dy < height:
+                    buffer[y + dy, x + dx] += (value - color) * weight
+    return result
+
+
+class TestDither(unittest.TestCase):
+    def setUp(self):
+        self.pixels = np.random.default_rng(0).integers(0, 256, size=(13, 17, 3), dtype=np.uint8)
+        self.image = Image.fromarray(self.pixels)
+
+    def test_bayer_matrix(self):
+        expected = (np.array([[0, 2], [3, 1]]) + 0.5) / 4 - 0.5
+        self.assertTrue(np.allclose(bayer_matrix(2), expected))
+        self.assertEqual(sorted(np.argsort(bayer_matrix(8).ravel())), list(range(64)))
+
+    def test_bayer_matrix_size(self):
+        with self.assertRaises(ValueError):
+            bayer_matrix(3)
+
+    def test_floyd_steinberg(self):
+        result = np.asarray(dither(self.image, palette, "floyd-steinberg"))
+        self.assertTrue(np.array_equal(result, reference_diffusion(self.pixels, "floyd-steinberg")))
+
+    def test_atkinson(self):
+        result = np.asarray(dither(self.image, palette, "atkinson"))
+        self.assertTrue(np.array_equal(result, reference_diffusion(self.pixels, "atkinson")))
+
+    def test_bayer_uses_palette(self):
+        gradient = np.tile(np.linspace(0, 255, 64).astype(np.uint8)[:, None], (1, 64 * 3)).reshape(64, 64, 3)
+        result = dither(Image.fromarray(gradient), palette, "bayer")
+        colors = {c for _, c in result.getcolors()}
+        self.assertTrue(colors.issubset(set(palette.values())))
+
+        # A smooth gradient should be dithered between more than just the nearest colors
+        self.assertGreater(len(colors), 2)
+
+    def test_lut_matches_search(self):
+        lut = build_palette_lut(palette, bits=8, save=False)
+        for method in ("floyd-steinberg", "bayer"):
+            self.assertEqual(
+                dither(self.image, palette, method).tobytes(), dither(self.image, palette, method, lut=lut).tobytes()
+            )
+
+    def test_keeps_alpha(self):
+        image = self.image.convert("RGBA")
+        image.putalpha(77)
+        result = dither(image, palette, "atkinson")
+        self.assertEqual(result.mode, "RGBA")
+        self.assertEqual(result.getpixel((3, 4))[3], 77)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            dither(self.image, palette, "random")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+from theia.palettes import PaletteMatcher, build_palette_lut, palette_hash, quantize_image
+
+palette = {
+    "red": (231, 76, 60),
+    "blue": (52, 152, 219),
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+}
+
+
+class TestPaletteLUT(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.lut_dir = self.tempdir.name
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_hash_ignores_names(self):
+        renamed = {str(i): c for i, c in enumerate(palette.values())}
+        self.assertEqual(palette_hash(palette), palette_hash(renamed))
+
+    def test_full_table_matches(self):
+        lut = build_palette_lut(palette, bits=8, save=False)
+        colors = np.random.default_rng(0).integers(0, 256, size=(1000, 3))
+        expected = PaletteMatcher(palette).query(colors)
+        self.assertTrue(np.array_equal(lut[colors[:, 0], colors[:, 1], colors[:, 2]], expected))
+
+    def test_saved_table(self):
+        lut = build_palette_lut(palette, bits=5, lut_dir=self.lut_dir)
+        self.assertEqual(lut.shape, (32, 32, 32))
+        self.assertEqual(len(os.listdir(self.lut_dir)), 1)
+
+        # Loading a second time should reuse the saved table
+        again = build_palette_lut(palette, bits=5, lut_dir=self.lut_dir)
+        self.assertIsInstance(again, np.memmap)
+        self.assertTrue(np.array_equal(lut, again))
+
+    def test_quantize_keeps_alpha(self):
+        lut = build_palette_lut(palette, bits=6, save=False)
+        image = Image.new("RGBA", (4, 4), (240, 70, 50, 100))
+        result = quantize_image(image, palette, lut)
+        self.assertEqual(result.mode, "RGBA")
+        self.assertEqual(result.getpixel((0, 0)), (231, 76, 60, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
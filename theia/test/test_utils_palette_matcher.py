@@ -0,0 +1,80 @@
+import unittest
+import numpy as np
+from PIL import Image
+from theia.palettes import PaletteMatcher, apply_palette, image_palette_indexes, nearest_in_palette
+
+palette = {
+    "red": (231, 76, 60),
+    "blue": (52, 152, 219),
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+}
+
+
+class TestPaletteMatcher(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.colors = rng.integers(0, 256, size=(500, 3), dtype=np.uint8)
+        self.expected = [nearest_in_palette(tuple(int(x) for x in c), palette) for c in self.colors]
+
+    def test_brute_force(self):
+        matcher = PaletteMatcher(palette, use_kdtree=False)
+        result = [tuple(int(x) for x in c) for c in matcher.nearest(self.colors)]
+        self.assertEqual(result, self.expected)
+
+    def test_kdtree(self):
+        matcher = PaletteMatcher(palette, use_kdtree=True)
+        result = [tuple(int(x) for x in c) for c in matcher.nearest(self.colors)]
+        self.assertEqual(result, self.expected)
+
+    def test_query_shape(self):
+        matcher = PaletteMatcher(palette)
+        indexes = matcher.query(self.colors.reshape(20, 25, 3))
+        self.assertEqual(indexes.shape, (20, 25))
+        self.assertTrue(np.all(indexes < len(palette)))
+
+    def test_nearest_color(self):
+        matcher = PaletteMatcher(palette)
+        self.assertEqual(matcher.nearest_color((250, 240, 245)), (255, 255, 255))
+        self.assertEqual(matcher.nearest_color((200, 80, 40, 255)), (231, 76, 60))
+
+    def test_manhattan(self):
+        options = {"0": (60, 0, 0), "1": (35, 35, 0)}
+        # Squared distance prefers (35, 35, 0), Manhattan prefers (60, 0, 0)
+        self.assertEqual(PaletteMatcher(options).nearest_color((0, 0, 0)), (35, 35, 0))
+        self.assertEqual(PaletteMatcher(options, metric="manhattan").nearest_color((0, 0, 0)), (60, 0, 0))
+
+    def test_empty_palette(self):
+        with self.assertRaises(ValueError):
+            PaletteMatcher({})
+
+
+class TestApplyPalette(unittest.TestCase):
+    def setUp(self):
+        pixels = np.random.default_rng(1).integers(0, 256, size=(16, 24, 4), dtype=np.uint8)
+        self.image = Image.fromarray(pixels)
+
+    def test_indexes(self):
+        indexes = image_palette_indexes(self.image, palette)
+        self.assertEqual(indexes.shape, (16, 24))
+        expected = nearest_in_palette(self.image.getpixel((5, 3))[:3], palette)
+        self.assertEqual(list(palette.values())[indexes[3, 5]], expected)
+
+    def test_apply_keeps_alpha(self):
+        result = apply_palette(self.image, palette)
+        self.assertEqual(result.mode, "RGBA")
+        self.assertEqual(result.size, self.image.size)
+        for xy in [(0, 0), (7, 11), (23, 15)]:
+            original = self.image.getpixel(xy)
+            expected = nearest_in_palette(original[:3], palette) + (original[3],)
+            self.assertEqual(result.getpixel(xy), expected)
+
+    def test_apply_rgb(self):
+        result = apply_palette(self.image.convert("RGB"), palette)
+        self.assertEqual(result.mode, "RGB")
+        colors = {c for _, c in result.getcolors()}
+        self.assertTrue(colors.issubset(set(palette.values())))
+
+
+if __name__ == "__main__":
+    unittest.main()
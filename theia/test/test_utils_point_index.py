@@ -0,0 +1,83 @@
+import unittest
+
+import numpy as np
+
+import theia.grid as grid
+from theia.grid import ArrayGrid, PointIndex
+
+
+def brute_force_distances(points: np.ndarray, queries: np.ndarray, wrap: int = None) -> np.ndarray:
+    delta = np.abs(queries[:, None] - points[None])
+    if wrap is not None:
+        delta = np.minimum(delta, wrap - delta)
+    return np.sqrt((delta ** 2).sum(axis=-1))
+
+
+class TestPointIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.points = rng.random((2000, 2)) * 100
+        self.queries = rng.random((200, 2)) * 120 - 10
+
+    def test_nearest(self):
+        # Test k-nearest queries match a brute force search
+        distances, indexes = PointIndex(self.points).query_nearest(self.queries, k=4)
+        expected = brute_force_distances(self.points, self.queries)
+        np.testing.assert_allclose(distances, np.sort(expected, axis=1)[:, :4])
+        np.testing.assert_allclose(np.take_along_axis(expected, indexes, axis=1), distances)
+
+    def test_radius(self):
+        # Test radius queries and counts match a brute force search
+        index = PointIndex(self.points)
+        expected = brute_force_distances(self.points, self.queries) <= 5
+        for result, row in zip(index.query_radius(self.queries, 5), expected):
+            self.assertEqual(sorted(result.tolist()), np.flatnonzero(row).tolist())
+        np.testing.assert_array_equal(index.count_radius(self.queries, 5), expected.sum(axis=1))
+
+    def test_wrap(self):
+        # Test toroidal distances wrap around the edges
+        queries = self.queries % 100
+        index = PointIndex(self.points, wrap=100)
+        distances, _ = index.query_nearest(queries, k=3)
+        expected = brute_force_distances(self.points, queries, wrap=100)
+        np.testing.assert_allclose(distances, np.sort(expected, axis=1)[:, :3])
+        np.testing.assert_array_equal(index.count_radius(queries, 8), (expected <= 8).sum(axis=1))
+
+        corner = PointIndex([(1, 1), (50, 50)], wrap=100)
+        self.assertEqual(corner.query_nearest((99, 99))[1].tolist(), [0])
+
+    def test_grid_input(self):
+        # Test indexes can be built from grids, and single points can be queried
+        square = grid.build(size=50, num=6)
+        for points in [grid.flatten(square), ArrayGrid.from_list(square)]:
+            index = PointIndex(points)
+            self.assertEqual(len(index), 36)
+            distances, indexes = index.query_nearest((21, 19), k=1)
+            self.assertEqual(indexes.tolist(), [14])
+            self.assertEqual(sorted(index.query_radius((20, 20), 10).tolist()), [8, 13, 14, 15, 20])
+
+    def test_too_many_neighbours(self):
+        with self.assertRaises(ValueError):
+            PointIndex([(0, 0)]).query_nearest((1, 1), k=2)
+
+    def test_clustered(self):
+        # Test a dense cluster (all in one cell) is searched in chunks of bounded size, with correct results
+        rng = np.random.default_rng(1)
+        points = np.concatenate([rng.normal(5000, 1, (3000, 2)), rng.random((10, 2)) * 10000])
+        index = PointIndex(points)
+        index.CANDIDATE_CHUNK = 10000
+
+        queries = points[:200]
+        sizes = [(n, len(query_index)) for _, n, query_index, *_ in index._candidates(queries, 1)]
+        self.assertEqual(sum(n for n, _ in sizes), len(queries))
+        self.assertTrue(all(pairs <= index.CANDIDATE_CHUNK or n == 1 for n, pairs in sizes))
+
+        distances, indexes = index.query_nearest(queries, k=2)
+        expected = np.sort(brute_force_distances(points, queries), axis=1)[:, :2]
+        np.testing.assert_allclose(distances, expected)
+        counts = (brute_force_distances(points, queries) <= 0.5).sum(axis=1)
+        np.testing.assert_array_equal(index.count_radius(queries, 0.5), counts)
+
+
+if __name__ == "__main__":
+    unittest.main()
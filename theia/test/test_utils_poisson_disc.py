@@ -0,0 +1,53 @@
+import unittest
+from random import Random
+
+import numpy as np
+from PIL import Image
+
+import theia.grid as grid
+
+
+def min_distance(points: np.ndarray, size: int = None) -> float:
+    delta = np.abs(points[:, None] - points[None])
+    if size is not None:
+        delta = np.minimum(delta, size - delta)
+    distance = np.sqrt((delta ** 2).sum(axis=-1))
+    np.fill_diagonal(distance, np.inf)
+    return distance.min()
+
+
+class TestPoissonDisc(unittest.TestCase):
+    def test_spacing(self):
+        # Test no points are closer than the radius, and every point is on the grid
+        points = np.array(grid.flatten(grid.poisson_disc(256, 12, rng=Random(0))))
+        self.assertGreater(len(points), 200)
+        self.assertGreaterEqual(min_distance(points), 12)
+        self.assertTrue(((points >= 0) & (points < 256)).all())
+
+    def test_wrap(self):
+        # Test spacing holds across the edges when wrapping
+        points = np.array(grid.flatten(grid.poisson_disc(256, 12, wrap=True, rng=Random(0))))
+        self.assertGreaterEqual(min_distance(points, 256), 12)
+        self.assertTrue(((points >= 0) & (points < 256)).all())
+
+    def test_repeatable(self):
+        # Test the same seed gives the same points
+        self.assertEqual(grid.poisson_disc(128, 10, rng=Random(3)), grid.poisson_disc(128, 10, rng=Random(3)))
+
+    def test_rows(self):
+        # Test points are split into rows, sorted left to right
+        result = grid.poisson_disc(128, 10, rng=Random(1))
+        for row in result:
+            self.assertEqual(row, sorted(row))
+            self.assertEqual(len({y // 10 for _, y in row}), 1)
+
+    def test_density(self):
+        # Test darker areas of the density image get more points
+        density = Image.linear_gradient("L").resize((128, 128))
+        points = np.array(grid.flatten(grid.poisson_disc(128, 16, density=density, min_radius=4, rng=Random(2))))
+        self.assertGreaterEqual(min_distance(points), 4)
+        self.assertGreater((points[:, 1] < 64).sum(), 3 * (points[:, 1] >= 64).sum())
+
+
+if __name__ == "__main__":
+    unittest.main()
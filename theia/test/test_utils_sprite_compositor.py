@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from theia.image import SpriteCompositor, alpha_composite_into, wrap_regions, wrapped_alpha_composite
+
+
+def random_image(rng: np.random.Generator, size: tuple[int, int]) -> Image:
+    pixels = rng.integers(0, 256, (size[1], size[0], 4), dtype=np.uint8)
+    pixels[::3, :, 3] = 0
+    pixels[1::3, :, 3] = 255
+    return Image.fromarray(pixels, "RGBA")
+
+
+class TestSpriteCompositor(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_alpha_composite(self):
+        # Test array compositing exactly matches PIL
+        background = random_image(self.rng, (64, 48))
+        foreground = random_image(self.rng, (64, 48))
+        pixels = np.array(background)
+        alpha_composite_into(pixels, np.asarray(foreground))
+        self.assertEqual(pixels.tobytes(), Image.alpha_composite(background, foreground).tobytes())
+
+    def test_wrap_regions(self):
+        # Test regions cover the whole paste exactly once, within the canvas
+        for coord in [(10, 10), (-5, 3), (90, 95), (-20, -20)]:
+            regions = list(wrap_regions((100, 100), coord, (30, 30)))
+            self.assertLessEqual(len(regions), 4)
+            self.assertEqual(sum(w * h for *_, w, h in regions), 900)
+            for dx, dy, sx, sy, w, h in regions:
+                self.assertTrue(0 <= dx and dx + w <= 100 and 0 <= dy and dy + h <= 100)
+                self.assertEqual(((coord[0] + sx) % 100, (coord[1] + sy) % 100), (dx, dy))
+
+    def test_matches_wrapped_composite(self):
+        # Test drawing matches compositing each sprite with wrapped_alpha_composite
+        canvas = random_image(self.rng, (128, 96))
+        sprites = [random_image(self.rng, (40, 30)) for _ in range(3)]
+        expected = canvas.copy()
+        compositor = SpriteCompositor(canvas)
+        for i, coord in enumerate([(5, 5), (-10, 70), (110, -8), (100, 80), (60, 40)]):
+            sprite = sprites[i % 3]
+            wrapped_alpha_composite(expected, sprite, coord)
+            compositor.draw(sprite, coord)
+        self.assertEqual(compositor.image().tobytes(), expected.tobytes())
+
+    def test_cache(self):
+        # Test transformed sprites are cached and evicted
+        sprite = random_image(self.rng, (40, 40))
+        compositor = SpriteCompositor(Image.new("RGBA", (64, 64)), cache_size=2)
+        rotated = compositor.sprite(sprite, 20, 30)
+        self.assertIs(compositor.sprite(sprite, 20, 30), rotated)
+        expected = sprite.resize((20, 20)).rotate(30, Image.NEAREST, expand=True)
+        self.assertEqual(rotated.tobytes(), expected.tobytes())
+
+        compositor.sprite(sprite, 10)
+        compositor.sprite(sprite, 12)
+        self.assertEqual((compositor.hits, compositor.misses), (1, 3))
+        self.assertIsNot(compositor.sprite(sprite, 20, 30), rotated)
+
+    def test_wrapped_composite_tiles(self):
+        # Test pastes larger than the canvas are tiled
+        pattern = np.array(random_image(self.rng, (50, 40)))
+        pattern[..., 3] = 255
+        paste = Image.fromarray(np.tile(pattern, (3, 4, 1)), "RGBA")
+        canvas = wrapped_alpha_composite(Image.new("RGBA", (50, 40)), paste, (-13, 7))
+        expected = np.roll(pattern, (7, -13), axis=(0, 1))
+        self.assertEqual(canvas.tobytes(), expected.tobytes())
+
+
+if __name__ == "__main__":
+    unittest.main()